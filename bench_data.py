@@ -0,0 +1,105 @@
+"""Synthetic warehouse data for benchmarking pt.py.
+
+Generates the inputs pt.py works with: the shipment sheet (as returned by
+gspread's get_all_values), the packing list Excel ('All number' sheet),
+SVG layouts with CX-Y locations and streams of pallet scans.
+"""
+import random
+
+import pandas as pd
+
+BOXES_PER_PALLET = 8
+SERIALS_PER_BOX = 6
+
+
+def shipment_sheet(trucks, pallets_per_truck, title_rows=2, seed=0):
+    """Rows of the shipment Google Sheet, including a couple of title rows above the headers."""
+    rng = random.Random(seed)
+    rows = [["EMBARQUES"] + [""] * 5 for _ in range(title_rows)]
+    rows.append(["CAMION", "CLIENTE", "PALLET INICIAL", "PALLET FINAL", "LISTO PARA ENTREGA", "ESTATUS"])
+    for t in range(trucks):
+        first = t * pallets_per_truck + 1
+        rows.append([
+            str(t + 1),
+            f"CLIENTE {rng.randint(1, 20)}",
+            str(first),
+            str(first + pallets_per_truck - 1),
+            "",
+            rng.choice(["", "", "Pendiente", "LISTO"]),
+        ])
+    return rows
+
+
+class FakeSheet:
+    """In-memory stand-in for a gspread worksheet."""
+
+    def __init__(self, rows):
+        self.rows = rows
+
+    def get_all_values(self):
+        return [list(r) for r in self.rows]
+
+
+class FakeSheetsClient:
+    """Mimics `gspread.Client.open_by_key(...).sheet1` for load_all_data."""
+
+    def __init__(self, rows):
+        self.sheet1 = FakeSheet(rows)
+
+    def open_by_key(self, key):
+        return self
+
+
+def packing_list(serial_rows, seed=0):
+    """DataFrame shaped like the 'All number' sheet, with the usual blank (merged) cells."""
+    rng = random.Random(seed)
+    boxes, pallets, serials = [], [], []
+    per_pallet = BOXES_PER_PALLET * SERIALS_PER_BOX
+    for i in range(serial_rows):
+        new_box = i % SERIALS_PER_BOX == 0
+        new_pallet = i % per_pallet == 0
+        boxes.append(f"B{i // SERIALS_PER_BOX + 1:06d}" if new_box else None)
+        pallets.append(f"{i // per_pallet + 1}" if new_pallet else None)
+        serials.append(f"SN{rng.randint(10**9, 10**10 - 1)}{i:07d}")
+    return pd.DataFrame({"Box number": boxes, "Pallet number": pallets, "Serial number": serials})
+
+
+def write_packing_list(path, serial_rows, seed=0):
+    packing_list(serial_rows, seed).to_excel(path, sheet_name="All number", index=False)
+    return path
+
+
+def svg_layout(locations, trucks=None, per_row=20):
+    """SVG with one rect and one label per location, ids C<truck>-<n>."""
+    trucks = trucks or max(1, locations // 50)
+    per_truck = -(-locations // trucks)
+    parts = ['<svg width="2000" height="2000" xmlns="http://www.w3.org/2000/svg">']
+    i = 0
+    for t in range(1, trucks + 1):
+        for n in range(1, per_truck + 1):
+            if i >= locations:
+                break
+            x = (i % per_row) * 60
+            y = (i // per_row) * 40
+            parts.append(f'<rect id="C{t}-{n}" x="{x}" y="{y}" width="50" height="30" fill="#cccccc" stroke="#666666"/>')
+            parts.append(f'<text data-ubicacion="C{t}-{n}" x="{x + 25}" y="{y + 15}">C{t}-{n}</text>')
+            i += 1
+    parts.append("</svg>")
+    return "\n".join(parts)
+
+
+def scan_stream(pallet_summary, count, duplicate_rate=0.05, unknown_rate=0.02, seed=0):
+    """(first_serial, last_serial) pairs as a scanner would send them, with some repeats and misreads."""
+    rng = random.Random(seed)
+    pallets = list(zip(pallet_summary["first_serial"].astype(str), pallet_summary["last_serial"].astype(str)))
+    rng.shuffle(pallets)
+    stream = []
+    for i in range(count):
+        r = rng.random()
+        if stream and r < duplicate_rate:
+            stream.append(rng.choice(stream))
+        elif r < duplicate_rate + unknown_rate:
+            stream.append((f"SNX{rng.randint(0, 10**9)}", f"SNX{rng.randint(0, 10**9)}"))
+        else:
+            stream.append(pallets[i % len(pallets)])
+    return stream
@@ -0,0 +1,175 @@
+"""Benchmark suite for the pt.py hot paths.
+
+Times shipment parsing (load_all_data), load_packing_data, the per-truck
+pallet lookup, parse_svg_xml, generate_enhanced_svg_layout, location
+assignment and a full tab3 ("Entregar Embarques") pass over synthetic data
+of growing size, and writes machine-readable results that can be compared
+between commits.
+
+Everything runs against warehouse_engine, the headless core pt.py renders
+from, so the code being timed is exactly what the app uses.
+
+Usage:
+    python bench_pt.py [--scales small,medium,large] [--repeat 3] [--out results.json]
+    python bench_pt.py --compare before.json after.json
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import pandas as pd
+
+import bench_data
+import warehouse_engine
+from warehouse_engine import WarehouseEngine
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+SCALES = {
+    # packing serial rows, layout locations, scans
+    "small": {"serial_rows": 10_000, "locations": 100, "scans": 200},
+    "medium": {"serial_rows": 50_000, "locations": 1_000, "scans": 1_000},
+    "large": {"serial_rows": 200_000, "locations": 10_000, "scans": 5_000},
+}
+PALLETS_PER_TRUCK = 20
+
+
+def load_all_data(client):
+    """The Sheets half of pt.load_all_data, minus st.cache_data."""
+    return warehouse_engine.parse_shipment_values(client.open_by_key("bench").sheet1.get_all_values())
+
+
+def timed(fn, repeat):
+    times = []
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        times.append(time.perf_counter() - start)
+    return {"min": min(times), "median": statistics.median(times), "runs": len(times)}, result
+
+
+def run_scale(name, params, repeat, workdir):
+    results = {}
+
+    # Inputs
+    packing_path = bench_data.write_packing_list(os.path.join(workdir, f"packing_{name}.xlsx"), params["serial_rows"])
+    per_pallet = bench_data.BOXES_PER_PALLET * bench_data.SERIALS_PER_BOX
+    pallets = -(-params["serial_rows"] // per_pallet)
+    trucks = max(1, pallets // PALLETS_PER_TRUCK)
+    sheet_rows = bench_data.shipment_sheet(trucks, PALLETS_PER_TRUCK)
+    svg = bench_data.svg_layout(params["locations"], trucks=max(1, min(trucks, params["locations"] // 10)))
+
+    results["load_all_data"], (shipment_df, _) = timed(
+        lambda: load_all_data(bench_data.FakeSheetsClient(sheet_rows)), repeat)
+    results["load_packing_data"], (packing_df, pallet_summary) = timed(
+        lambda: warehouse_engine.load_packing_data(packing_path), repeat)
+
+    engine = WarehouseEngine(db_path=os.path.join(workdir, f"scans_{name}.db"))
+    engine.set_shipments(shipment_df)
+    engine.set_packing(packing_df, pallet_summary)
+    engine.init_db()
+
+    truck_row = shipment_df.iloc[len(shipment_df) // 2]
+    results["get_truck_pallets"], truck_pallets = timed(
+        lambda: warehouse_engine.select_truck_pallets(truck_row, pallet_summary), repeat)
+
+    results["parse_svg_xml"], (locations, shapes) = timed(lambda: warehouse_engine.parse_svg_xml(svg), repeat)
+    engine.set_layout(locations, shapes, "svg")
+
+    # Scan stream: every scan goes through engine.scan for the truck that owns the pallet
+    scans = bench_data.scan_stream(pallet_summary, params["scans"])
+    serial_to_truck = {}
+    for _, r in shipment_df.iterrows():
+        for _, p in engine.truck_pallets(r['CAMION']).iterrows():
+            serial_to_truck[(str(p['first_serial']), str(p['last_serial']))] = str(r['CAMION'])
+
+    def assign_stream():
+        engine.clear()
+        for first, last in scans:
+            engine.scan(serial_to_truck.get((first, last), "1"), first, last)
+        engine.flush()
+
+    stream_stats, _ = timed(assign_stream, repeat)
+    stream_stats["per_scan"] = stream_stats["median"] / max(len(scans), 1)
+    results["assign_pallet_location"] = stream_stats
+
+    selected = str(truck_row['CAMION'])
+    results["generate_enhanced_svg_layout"], _ = timed(
+        lambda: warehouse_engine.generate_enhanced_svg_layout(shapes, engine.pallet_assignments, selected, truck_pallets), repeat)
+
+    results["tab3_pass"], _ = timed(engine.completed_trucks, repeat)
+
+    return {
+        "params": dict(params, trucks=trucks, pallets=pallets),
+        "timings": results,
+    }
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT,
+                                       stderr=subprocess.DEVNULL).decode().strip()
+    except Exception:
+        return None
+
+
+def compare(before_path, after_path):
+    with open(before_path) as f:
+        before = json.load(f)
+    with open(after_path) as f:
+        after = json.load(f)
+    print(f"{'scale':<8}{'stage':<32}{'before':>12}{'after':>12}{'ratio':>8}")
+    for scale, data in after["scales"].items():
+        old = before["scales"].get(scale)
+        if not old:
+            continue
+        for stage, timing in data["timings"].items():
+            if stage not in old["timings"]:
+                continue
+            b = old["timings"][stage]["median"]
+            a = timing["median"]
+            print(f"{scale:<8}{stage:<32}{b:>12.4f}{a:>12.4f}{(a / b if b else float('nan')):>8.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scales", default="small,medium")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--out", default="bench_results.json")
+    parser.add_argument("--compare", nargs=2, metavar=("BEFORE", "AFTER"))
+    args = parser.parse_args()
+
+    if args.compare:
+        compare(*args.compare)
+        return
+
+    report = {
+        "commit": git_commit(),
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "pandas": pd.__version__,
+        "repeat": args.repeat,
+        "scales": {},
+    }
+    out_path = os.path.abspath(args.out)
+    with tempfile.TemporaryDirectory() as workdir:
+        for name in args.scales.split(","):
+            print(f"== {name} ==", flush=True)
+            report["scales"][name] = run_scale(name, SCALES[name], args.repeat, workdir)
+            for stage, t in report["scales"][name]["timings"].items():
+                print(f"  {stage:<32}{t['median'] * 1000:>12.2f} ms")
+
+    with open(out_path, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Results written to {out_path}")
+
+
+if __name__ == "__main__":
+    main()
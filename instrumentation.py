@@ -0,0 +1,178 @@
+"""Spans/temporizadores ligeros para las etapas calientes de pt.py y del motor.
+
+    from instrumentation import tracer
+
+    with tracer.span("sqlite.save_scan"):
+        ...
+
+Cada etapa guarda sus últimas duraciones en una ventana circular y reporta
+p50/p95/p99. Desactivado (por defecto, o PT_TRACE=0) `span()` regresa un
+contexto nulo compartido, así que el costo es una comparación.
+
+`tracer` no guarda datos: reenvía al Tracer activo del contexto (`activate`),
+de modo que cada sesión de Streamlit mide en su propio Tracer y su casilla
+no enciende ni apaga la medición de las demás. Sin Tracer activo (scripts,
+CLI, benchmarks) se usa `default_tracer`.
+"""
+import contextvars
+import csv
+import functools
+import io
+import json
+import math
+import os
+import threading
+import time
+from collections import deque
+
+WINDOW = 1000
+SUMMARY_FIELDS = ["stage", "count", "last_ms", "p50_ms", "p95_ms", "p99_ms", "max_ms"]
+
+
+class _NullSpan:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class _Span:
+    __slots__ = ("tracer", "name", "start")
+
+    def __init__(self, tracer, name):
+        self.tracer = tracer
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.tracer.record(self.name, time.perf_counter() - self.start)
+        return False
+
+
+def _percentile(ordered, q):
+    # Nearest-rank sobre la ventana ya ordenada
+    index = max(0, min(len(ordered) - 1, math.ceil(q * len(ordered)) - 1))
+    return ordered[index]
+
+
+class Tracer:
+    """Duraciones por etapa (ventana de `window` muestras), seguro entre hilos."""
+
+    def __init__(self, enabled=False, window=WINDOW):
+        self.enabled = enabled
+        self.window = window
+        self._samples = {}
+        self._counts = {}
+        self._lock = threading.Lock()
+
+    def span(self, name):
+        if not self.enabled:
+            return _NULL_SPAN
+        return _Span(self, name)
+
+    def timed(self, name):
+        """Decorador: mide cada llamada a la función como la etapa `name`."""
+        def decorator(fn):
+            @functools.wraps(fn)
+            def wrapper(*args, **kwargs):
+                if not self.enabled:
+                    return fn(*args, **kwargs)
+                with _Span(self, name):
+                    return fn(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def record(self, name, seconds):
+        with self._lock:
+            samples = self._samples.get(name)
+            if samples is None:
+                samples = self._samples[name] = deque(maxlen=self.window)
+                self._counts[name] = 0
+            samples.append(seconds)
+            self._counts[name] += 1
+
+    def reset(self):
+        with self._lock:
+            self._samples.clear()
+            self._counts.clear()
+
+    def summary(self):
+        """Una fila por etapa (en ms), ordenadas por p95 descendente."""
+        with self._lock:
+            snapshot = {name: (list(samples), self._counts[name]) for name, samples in self._samples.items()}
+        rows = []
+        for name, (samples, count) in snapshot.items():
+            ordered = sorted(samples)
+            rows.append({
+                "stage": name,
+                "count": count,
+                "last_ms": round(samples[-1] * 1000, 3),
+                "p50_ms": round(_percentile(ordered, 0.50) * 1000, 3),
+                "p95_ms": round(_percentile(ordered, 0.95) * 1000, 3),
+                "p99_ms": round(_percentile(ordered, 0.99) * 1000, 3),
+                "max_ms": round(ordered[-1] * 1000, 3),
+            })
+        rows.sort(key=lambda r: r["p95_ms"], reverse=True)
+        return rows
+
+    def to_json(self):
+        return json.dumps({"generated_at": time.time(), "window": self.window, "stages": self.summary()}, indent=2)
+
+    def to_csv(self):
+        buffer = io.StringIO()
+        writer = csv.DictWriter(buffer, fieldnames=SUMMARY_FIELDS)
+        writer.writeheader()
+        writer.writerows(self.summary())
+        return buffer.getvalue()
+
+
+class ActiveTracer:
+    """Fachada del Tracer activo; los decoradores lo resuelven en cada llamada, no al importar."""
+
+    def __init__(self, default):
+        self.default = default
+
+    def current(self):
+        return _active.get() or self.default
+
+    @property
+    def enabled(self):
+        return self.current().enabled
+
+    def span(self, name):
+        return self.current().span(name)
+
+    def timed(self, name):
+        def decorator(fn):
+            @functools.wraps(fn)
+            def wrapper(*args, **kwargs):
+                current = self.current()
+                if not current.enabled:
+                    return fn(*args, **kwargs)
+                with _Span(current, name):
+                    return fn(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def record(self, name, seconds):
+        self.current().record(name, seconds)
+
+
+def activate(session_tracer):
+    """Usa `session_tracer` en el contexto actual (el hilo del script y lo que se lance con `contextvars.copy_context`)."""
+    return _active.set(session_tracer)
+
+
+# Valor inicial de la casilla en cada sesión nueva
+TRACE_DEFAULT = os.environ.get("PT_TRACE", "0") == "1"
+
+_active = contextvars.ContextVar("instrumentation_tracer", default=None)
+default_tracer = Tracer(enabled=TRACE_DEFAULT)
+tracer = ActiveTracer(default_tracer)
@@ -0,0 +1,264 @@
+"""Orígenes de la hoja de embarques para el motor del almacén.
+
+- GoogleSheetsSource: una o varias hojas de Google; el cliente se crea la
+  primera vez que se cargan datos, no al arrancar la app.
+- LocalFileSource: un CSV/XLSX local (trabajo sin conexión o pruebas); se
+  vuelve a leer solo cuando cambia el mtime, y si un CSV solo creció se leen
+  únicamente las filas nuevas.
+"""
+import contextvars
+import csv
+import io
+import os
+import threading
+import time
+from abc import ABC, abstractmethod
+
+import pandas as pd
+
+from instrumentation import tracer
+from warehouse_engine import SOURCE_COLUMN, TARGET_HEADERS, find_header_row, load_shipment_sheets, parse_shipment_values
+
+STATUS_COLUMN = 19
+
+try:
+    from openpyxl import load_workbook
+except ImportError:
+    load_workbook = None
+
+
+class SourceUnavailable(Exception):
+    """El origen no se puede usar (sin credenciales, archivo inexistente...)."""
+
+
+class ShipmentSource(ABC):
+    """Origen de embarques. `load` regresa el shipment_df en el formato de parse_shipment_values."""
+
+    name = "shipments"
+
+    @abstractmethod
+    def load(self):
+        """Lee los embarques. Regresa (shipment_df, errors) con errors = {origen: mensaje} de lo que no cargó."""
+
+    def has_changes(self):
+        """True si `load` traería datos distintos a la última carga."""
+        return False
+
+    def update_status(self, truck, status):
+        """Refleja el estatus del camión en el origen (en segundo plano si es remoto)."""
+
+
+class GoogleSheetsSource(ShipmentSource):
+    """Hojas de Google Sheets cargadas en paralelo; `client_factory()` se llama solo al cargar."""
+
+    name = "google_sheets"
+
+    def __init__(self, sheet_ids, client_factory, max_workers=4, timeout=30.0):
+        self.sheet_ids = tuple(sheet_ids)
+        self.client_factory = client_factory
+        self.max_workers = max_workers
+        self.timeout = timeout
+        self.sources = {}
+        self.shipment_df = None
+        self._client = None
+        self._client_lock = threading.Lock()
+
+    @property
+    def client(self):
+        with self._client_lock:
+            if self._client is None:
+                try:
+                    self._client = self.client_factory()
+                except Exception as e:
+                    raise SourceUnavailable(f"Google Sheets no disponible: {e}") from e
+                if self._client is None:
+                    raise SourceUnavailable("No se encontraron credenciales válidas de Google")
+            return self._client
+
+    def load(self):
+        client = self.client
+
+        def fetch(sheet_id):
+            with tracer.span("sheets.fetch"):
+                sheet = client.open_by_key(sheet_id).sheet1
+                return sheet.get_all_values(), sheet
+
+        with tracer.span("sheets.load_all"):
+            shipment_df, sources = load_shipment_sheets(fetch, self.sheet_ids, self.max_workers, self.timeout)
+        errors = {sheet_id: info['error'] for sheet_id, info in sources.items() if info['error']}
+        if len(errors) == len(self.sheet_ids):
+            raise SourceUnavailable("; ".join(f"{sheet_id}: {error}" for sheet_id, error in errors.items()))
+        self.sources = sources
+        self.shipment_df = shipment_df
+        return shipment_df, errors
+
+    def update_status(self, truck, status):
+        # Actualizar en la hoja de origen del camión
+        if self.shipment_df is None:
+            return
+        origin = self.shipment_df.loc[self.shipment_df['CAMION'] == str(truck), SOURCE_COLUMN]
+        source = self.sources.get(origin.iloc[0]) if len(origin) else None
+        if not source or source['handle'] is None:
+            return
+        sheet, header_row = source['handle'], source['header_row']
+
+        def update_async():
+            try:
+                time.sleep(1)
+                with tracer.span("sheets.update_status"):
+                    truck_cells = sheet.findall(str(truck))
+                    for cell in truck_cells:
+                        if cell.row > header_row:
+                            sheet.update_cell(cell.row, STATUS_COLUMN, status)
+                            break
+            except Exception:
+                pass
+
+        thread = threading.Thread(target=contextvars.copy_context().run, args=(update_async,))
+        thread.daemon = True
+        thread.start()
+
+
+class LocalFileSource(ShipmentSource):
+    """Embarques desde un CSV o XLSX local con el mismo contenido que la hoja (incluidas filas de título).
+
+    El estatus de los camiones se escribe en el archivo (columna STATUS_COLUMN,
+    igual que en la hoja) en segundo plano; el cambio de mtime hace que la
+    siguiente carga lo refleje. `statuses` guarda lo último enviado y
+    `last_error` el error de la última escritura, si la hubo.
+    """
+
+    name = "local_file"
+
+    def __init__(self, path):
+        self.path = path
+        self.statuses = {}
+        self.last_error = None
+        self._write_lock = threading.Lock()
+        self._mtime = None
+        self._offset = 0         # bytes del CSV ya leídos
+        self._tail = b""         # últimos bytes leídos, para detectar que el archivo solo creció
+        self._rows = []
+        self._partial = []
+
+    def _stat(self):
+        try:
+            return os.stat(self.path)
+        except OSError as e:
+            raise SourceUnavailable(f"No se puede leer {self.path}: {e}") from e
+
+    def has_changes(self):
+        try:
+            return os.stat(self.path).st_mtime_ns != self._mtime
+        except OSError:
+            return False
+
+    def load(self):
+        stat = self._stat()
+        if stat.st_mtime_ns != self._mtime:
+            with tracer.span("local.load"):
+                if self.path.lower().endswith(('.xlsx', '.xls')):
+                    self._rows, self._partial = self._read_excel(), []
+                else:
+                    self._read_csv(stat.st_size)
+            self._mtime = stat.st_mtime_ns
+        rows = self._rows + self._partial
+        shipment_df, _ = parse_shipment_values(rows) if rows else (pd.DataFrame(columns=TARGET_HEADERS), 0)
+        shipment_df[SOURCE_COLUMN] = os.path.basename(self.path)
+        return shipment_df, {}
+
+    def _read_excel(self):
+        sheet = pd.read_excel(self.path, header=None, dtype=str).fillna('')
+        return sheet.values.tolist()
+
+    def _read_csv(self, size):
+        with open(self.path, 'rb') as f:
+            appended = False
+            if self._offset and size >= self._offset:
+                f.seek(self._offset - len(self._tail))
+                appended = f.read(len(self._tail)) == self._tail
+            if not appended:
+                self._rows = []
+                self._offset = 0
+                f.seek(0)
+            data = f.read()
+        end = data.rfind(b'\n') + 1
+        # Una última línea sin salto (a medio escribir, o sin salto final) se lee pero se vuelve a leer en la próxima carga
+        self._partial = self._parse(data[end:], self._offset + end == 0) if end < len(data) else []
+        if end:
+            self._rows.extend(self._parse(data[:end], self._offset == 0))
+            self._offset += end
+            self._tail = (self._tail + data[:end])[-64:]
+
+    def _parse(self, chunk, at_start):
+        text = chunk.decode('utf-8-sig' if at_start else 'utf-8', errors='replace')
+        return [row for row in csv.reader(io.StringIO(text)) if any(cell.strip() for cell in row)]
+
+    def update_status(self, truck, status):
+        self.statuses[str(truck)] = status
+        thread = threading.Thread(target=contextvars.copy_context().run, args=(self._write_status, str(truck), status))
+        thread.daemon = True
+        thread.start()
+
+    def _write_status(self, truck, status):
+        # Un escritor a la vez; se escribe a un temporal y se reemplaza para no dejar el archivo a medias
+        try:
+            with self._write_lock, tracer.span("local.update_status"):
+                if self.path.lower().endswith('.xlsx'):
+                    self._write_status_excel(truck, status)
+                elif self.path.lower().endswith('.xls'):
+                    raise SourceUnavailable("No se puede escribir el estatus en un .xls; usa .xlsx o .csv")
+                else:
+                    self._write_status_csv(truck, status)
+            self.last_error = None
+        except Exception as e:
+            self.last_error = f"Estatus de {truck} no guardado en {self.path}: {e}"
+            print(self.last_error)
+
+    def _write_status_csv(self, truck, status):
+        with open(self.path, 'rb') as f:
+            data = f.read()
+        encoding = 'utf-8-sig' if data.startswith(b'\xef\xbb\xbf') else 'utf-8'
+        newline = '\r\n' if b'\r\n' in data else '\n'
+        rows = list(csv.reader(io.StringIO(data.decode(encoding))))
+        if not _set_status(rows, truck, status):
+            return
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'w', encoding=encoding, newline='') as f:
+            csv.writer(f, lineterminator=newline).writerows(rows)
+        os.replace(tmp_path, self.path)
+
+    def _write_status_excel(self, truck, status):
+        if load_workbook is None:
+            raise SourceUnavailable("openpyxl no está instalado")
+        workbook = load_workbook(self.path)
+        # read_excel lee la primera hoja
+        sheet = workbook.worksheets[0]
+        rows = [['' if cell is None else str(cell) for cell in row] for row in sheet.iter_rows(values_only=True)]
+        index = _status_row(rows, truck)
+        if index is None:
+            return
+        sheet.cell(row=index + 1, column=STATUS_COLUMN, value=status)
+        tmp_path = self.path + '.tmp.xlsx'
+        workbook.save(tmp_path)
+        os.replace(tmp_path, self.path)
+
+
+def _status_row(rows, truck):
+    """Índice de la primera fila después de los encabezados con una celda igual a `truck` (como `findall` en la hoja)."""
+    for i in range(find_header_row(rows) + 1, len(rows)):
+        if any(str(cell).strip() == truck for cell in rows[i]):
+            return i
+    return None
+
+
+def _set_status(rows, truck, status):
+    index = _status_row(rows, truck)
+    if index is None:
+        return False
+    # Todas las filas del mismo ancho, como las regresa la hoja (parse_shipment_values lo espera)
+    width = max(STATUS_COLUMN, max(len(row) for row in rows))
+    for row in rows:
+        row.extend([''] * (width - len(row)))
+    rows[index][STATUS_COLUMN - 1] = status
+    return True
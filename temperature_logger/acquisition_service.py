@@ -0,0 +1,293 @@
+import asyncio
+import collections
+import queue
+import threading
+import time
+from array import array
+
+from run_stats import MeasurementRun
+from sample_filters import FilterChain
+from line_parser import LineParser
+
+
+class DeviceChannel:
+    """Connection state and ring buffer of readings for one ESP32."""
+
+    def __init__(self, name, ip, port=8080, buffer_size=256, filters=None):
+        self.name = name
+        self.ip = ip
+        self.port = int(port)
+        self.buffer = collections.deque(maxlen=buffer_size)  # (received_at, value)
+        self.lock = threading.Lock()
+        self.connected = False
+        self.connected_event = threading.Event()
+        self.last_error = None
+        self.last_rx = 0.0
+        self.total_readings = 0
+        self.filters = filters or FilterChain.default()
+        self.subscribers = []  # callback(name, received_at, raw, value), called on the service loop
+
+    def set_connected(self, connected):
+        self.connected = connected
+        if connected:
+            self.connected_event.set()
+        else:
+            self.connected_event.clear()
+
+    def publish(self, received_at, raw):
+        self.last_rx = received_at
+        value = self.filters.apply(raw)
+        if value is not None:
+            with self.lock:
+                self.buffer.append((received_at, value))
+                self.total_readings += 1
+        for callback in self.subscribers:
+            try:
+                callback(self.name, received_at, raw, value)
+            except Exception as e:
+                print(f"Acquisition subscriber error: {e}")
+
+    def latest(self):
+        with self.lock:
+            return self.buffer[-1] if self.buffer else None
+
+    def readings(self, since=None):
+        with self.lock:
+            items = list(self.buffer)
+        if since is None:
+            return items
+        return [r for r in items if r[0] > since]
+
+
+class _DeviceProtocol(asyncio.Protocol):
+    """Frames one device's stream with a LineParser and publishes each reading."""
+
+    def __init__(self, channel):
+        self.channel = channel
+        self.parser = LineParser()
+        self.times = array("d")
+        self.values = array("d")
+        self.closed = asyncio.get_running_loop().create_future()
+
+    def data_received(self, data):
+        times, values = self.times, self.values
+        self.parser.feed(data, time.time(), times, values)
+        for i in range(len(values)):
+            self.channel.publish(times[i], values[i])
+        del times[:]
+        del values[:]
+
+    def connection_lost(self, exc):
+        if not self.closed.done():
+            self.closed.set_result(exc)
+
+
+class AcquisitionService:
+    """Keeps persistent TCP connections to N ESP32 devices and reads them concurrently.
+
+    Each device streams one reading per line (firmware `client.println(dataLine)`).
+    Readings pass the device's filter chain and land in a per-device ring
+    buffer that other threads can poll; `measure` collects one run for a
+    device from a worker thread.
+    The service runs its own asyncio loop in a background thread (see `start`),
+    so it can be driven from the threaded Flet handlers in main.py. The
+    firmware serves one client at a time, so the process keeps a single
+    service shared by every session.
+    """
+
+    def __init__(self, buffer_size=256, connect_timeout=3.0, reconnect_delay=0.5, max_reconnect_delay=30.0, stale_after=3.0):
+        self.buffer_size = buffer_size
+        self.connect_timeout = connect_timeout
+        self.reconnect_delay = reconnect_delay
+        self.max_reconnect_delay = max_reconnect_delay
+        # The firmware sends every ~0.7s; silence longer than this means a dead link
+        self.stale_after = stale_after
+        self.devices = {}
+        self._tasks = {}
+        self._loop = None
+        self._thread = None
+        self._stopping = False
+
+    # --- Device registry ---
+    def add_device(self, name, ip, port=8080, filters=None):
+        """Register a device; if the service is running it starts reading immediately."""
+        channel = DeviceChannel(name, ip, port, self.buffer_size, filters)
+        self.devices[name] = channel
+        if self._loop and self._loop.is_running():
+            self._loop.call_soon_threadsafe(self._spawn, channel)
+        return channel
+
+    def ensure_device(self, name, ip, port=8080):
+        """Register `name` at ip:port, replacing it if its address changed. Returns its channel."""
+        channel = self.devices.get(name)
+        if channel and channel.ip == ip and channel.port == int(port):
+            return channel
+        if channel:
+            self.remove_device(name)
+        return self.add_device(name, ip, port)
+
+    def remove_device(self, name):
+        channel = self.devices.pop(name, None)
+        if channel:
+            channel.set_connected(False)
+        task = self._tasks.pop(name, None)
+        if task and self._loop:
+            self._loop.call_soon_threadsafe(task.cancel)
+
+    def subscribe(self, name, callback):
+        """Push every reading of device `name` to `callback(name, received_at, raw, value)`.
+
+        `value` is the filtered reading, or None when the device's filters rejected `raw`.
+        The callback runs on the service thread, so it must be quick (e.g. hand
+        off to a queue or a CoalescedUpdater). Returns an unsubscribe function.
+        """
+        channel = self.devices[name]
+        channel.subscribers.append(callback)
+        return lambda: channel.subscribers.remove(callback) if callback in channel.subscribers else None
+
+    def latest(self, name):
+        channel = self.devices.get(name)
+        return channel.latest() if channel else None
+
+    def readings(self, name, since=None):
+        channel = self.devices.get(name)
+        return channel.readings(since) if channel else []
+
+    def wait_connected(self, name, timeout):
+        channel = self.devices.get(name)
+        return bool(channel) and channel.connected_event.wait(timeout)
+
+    def status(self):
+        return {
+            name: {
+                "ip": ch.ip,
+                "connected": ch.connected,
+                "readings": ch.total_readings,
+                "rejected": ch.filters.rejected_count,
+                "latest": ch.latest(),
+                "error": ch.last_error,
+            }
+            for name, ch in list(self.devices.items())
+        }
+
+    # --- Measurement runs (called from worker threads) ---
+    def measure(self, name, on_reading, max_duration=10.0, poll_interval=0.25, run=None, mode="drain"):
+        """Collect one run from device `name`, calling `on_reading(accepted_count, elapsed)` as readings arrive.
+
+        The run only takes readings received after the call (the buffered
+        backlog is skipped) and has its own fresh filters, so its rejected
+        counts are per run.
+        mode="drain": the window starts immediately.
+        mode="fresh": wait (up to `stale_after`) for the first new reading and
+        start the window on it, so the whole window holds readings.
+        Ends after `max_duration`, when the run statistics are stable or when
+        the device disconnects. Returns the MeasurementRun.
+        """
+        run = run or MeasurementRun()
+        run.reset()
+        channel = self.devices[name]
+        incoming = queue.SimpleQueue()
+        unsubscribe = self.subscribe(name, lambda _name, received_at, raw, _value: incoming.put((received_at, raw)))
+        try:
+            started = time.time()
+            first = None
+            if mode == "fresh":
+                try:
+                    first = incoming.get(timeout=self.stale_after)
+                    started = time.time()
+                except queue.Empty:
+                    return run
+            while channel.connected and self.devices.get(name) is channel:
+                elapsed = time.time() - started
+                if elapsed >= max_duration or run.stats.is_stable():
+                    break
+                accepted = 0
+                try:
+                    item = first or incoming.get(timeout=min(poll_interval, max_duration - elapsed))
+                    first = None
+                    while True:
+                        if run.add(*item) is not None:
+                            accepted += 1
+                        item = incoming.get_nowait()
+                except queue.Empty:
+                    pass
+                on_reading(accepted, time.time() - started)
+        finally:
+            unsubscribe()
+        return run
+
+    # --- Asyncio side ---
+    def _spawn(self, channel):
+        old = self._tasks.get(channel.name)
+        if old:
+            old.cancel()
+        self._tasks[channel.name] = asyncio.ensure_future(self._device_loop(channel))
+
+    async def _device_loop(self, channel):
+        loop = asyncio.get_running_loop()
+        delay = self.reconnect_delay
+        while not self._stopping and self.devices.get(channel.name) is channel:
+            transport = None
+            try:
+                transport, protocol = await asyncio.wait_for(
+                    loop.create_connection(lambda: _DeviceProtocol(channel), channel.ip, channel.port),
+                    self.connect_timeout
+                )
+                channel.last_rx = time.time()
+                channel.set_connected(True)
+                channel.last_error = None
+                delay = self.reconnect_delay
+                await self._watch(channel, transport, protocol)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                channel.last_error = str(e) or e.__class__.__name__
+            finally:
+                channel.set_connected(False)
+                if transport:
+                    transport.close()
+
+            if self._stopping:
+                break
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, self.max_reconnect_delay)
+
+    async def _watch(self, channel, transport, protocol):
+        """Wait until the device closes the stream or goes silent for longer than `stale_after`."""
+        while True:
+            done, _ = await asyncio.wait([protocol.closed], timeout=self.stale_after)
+            if done:
+                channel.last_error = "closed by device"
+                return
+            if time.time() - channel.last_rx > self.stale_after:
+                channel.last_error = "no data"
+                transport.abort()
+                return
+
+    async def run(self):
+        """Read every registered device until `stop` is called."""
+        self._loop = asyncio.get_running_loop()
+        self._stopping = False
+        for channel in list(self.devices.values()):
+            self._spawn(channel)
+        while not self._stopping:
+            await asyncio.sleep(0.2)
+        tasks = list(self._tasks.values())
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._tasks.clear()
+
+    # --- Thread helpers ---
+    def start(self):
+        """Run the service loop in a daemon thread."""
+        if self._thread and self._thread.is_alive():
+            return
+        self._thread = threading.Thread(target=lambda: asyncio.run(self.run()), daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=2.0):
+        self._stopping = True
+        if self._thread:
+            self._thread.join(timeout)
+            self._thread = None
@@ -0,0 +1,111 @@
+import collections
+import hashlib
+import io
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+# Safe imports
+try:
+    from PIL import Image
+    from pyzbar.pyzbar import decode
+except:
+    Image = None
+    decode = None
+
+
+class BarcodeDecoder:
+    """Decodes barcodes from uploaded photos on a worker pool.
+
+    Phone photos are ~12MP, so each image is converted to grayscale and
+    downsampled first, then likely regions (centre, horizontal bands) are
+    tried before the whole frame. The full-resolution frame is only decoded
+    as a last resort. Results are cached by the SHA-1 of the image bytes.
+    """
+
+    def __init__(self, max_workers=2, max_side=1600, cache_size=256):
+        self.max_side = max_side
+        self.cache_size = cache_size
+        self._cache = collections.OrderedDict()
+        self._cache_lock = threading.Lock()
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="barcode")
+
+    @property
+    def available(self):
+        return Image is not None and decode is not None
+
+    def submit(self, data, callback=None):
+        """Decode `data` (image bytes or a file path) in the pool.
+
+        Returns a Future with the decoded text (or None). `callback(code, error)`
+        is called from the worker thread when given; `error` is the exception
+        when decoding failed (unreadable file, corrupt image...), so callers can
+        tell a failure apart from "no barcode found".
+        """
+        future = self._pool.submit(self.decode_bytes if isinstance(data, (bytes, bytearray)) else self.decode_file, data)
+        future.add_done_callback(lambda f: self._done(f, callback))
+        return future
+
+    def _done(self, future, callback):
+        error = future.exception()
+        if error is not None:
+            print(f"BarcodeDecoder Error: {error}")
+        if callback:
+            callback(None if error else future.result(), error)
+
+    def decode_file(self, path):
+        with open(path, "rb") as f:
+            return self.decode_bytes(f.read())
+
+    def decode_bytes(self, data):
+        """Synchronously decode one image; returns the first barcode's text or None."""
+        if not self.available:
+            return None
+        key = hashlib.sha1(data).hexdigest()
+        with self._cache_lock:
+            if key in self._cache:
+                self._cache.move_to_end(key)
+                return self._cache[key]
+
+        code = self._decode_image(data)
+
+        with self._cache_lock:
+            self._cache[key] = code
+            if len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return code
+
+    def _decode_image(self, data):
+        with Image.open(io.BytesIO(data)) as img:
+            original_size = img.size
+            # Decode at reduced size: draft() lets the JPEG decoder skip pixels entirely
+            img.draft("L", (self.max_side, self.max_side))
+            small = img.convert("L")
+        small.thumbnail((self.max_side, self.max_side))
+
+        for candidate in self._regions(small):
+            code = self._first_code(candidate)
+            if code:
+                return code
+
+        # Last resort: full resolution (fine print that didn't survive downsampling)
+        if small.size != original_size:
+            with Image.open(io.BytesIO(data)) as img:
+                return self._first_code(img.convert("L"))
+        return None
+
+    def _regions(self, img):
+        """ROI heuristics, cheapest first: centre crop, then three horizontal bands, then the whole frame."""
+        w, h = img.size
+        yield img.crop((int(w * 0.2), int(h * 0.3), int(w * 0.8), int(h * 0.7)))
+        for top in (0.0, 1 / 3, 2 / 3):
+            yield img.crop((0, int(h * top), w, int(h * (top + 1 / 3))))
+        yield img
+
+    def _first_code(self, img):
+        objs = decode(img)
+        if objs:
+            return objs[0].data.decode("utf-8")
+        return None
+
+    def shutdown(self):
+        self._pool.shutdown(wait=False)
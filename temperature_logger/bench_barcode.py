@@ -0,0 +1,67 @@
+"""Benchmark barcode decoding: naive full-frame decode vs the BarcodeDecoder pipeline.
+
+Usage: python bench_barcode.py <folder with sample images> [--workers 2] [--repeat 2]
+"""
+import argparse
+import os
+import time
+
+from barcode_decoder import BarcodeDecoder, Image, decode
+
+EXTENSIONS = (".jpg", ".jpeg", ".png", ".bmp", ".webp")
+
+
+def naive_decode(data_path):
+    # What process_scan used to do: full-resolution RGB image straight into pyzbar
+    with Image.open(data_path) as img:
+        objs = decode(img)
+    return objs[0].data.decode("utf-8") if objs else None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("folder")
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--repeat", type=int, default=2, help="passes over the folder (later passes hit the cache)")
+    args = parser.parse_args()
+
+    if Image is None or decode is None:
+        raise SystemExit("pillow and pyzbar are required")
+
+    paths = sorted(
+        os.path.join(args.folder, f) for f in os.listdir(args.folder) if f.lower().endswith(EXTENSIONS)
+    )
+    if not paths:
+        raise SystemExit(f"No images in {args.folder}")
+    blobs = []
+    for p in paths:
+        with open(p, "rb") as f:
+            blobs.append(f.read())
+
+    start = time.perf_counter()
+    naive = [naive_decode(p) for p in paths]
+    naive_time = time.perf_counter() - start
+
+    decoder = BarcodeDecoder(max_workers=args.workers)
+    pipeline_times = []
+    for _ in range(args.repeat):
+        start = time.perf_counter()
+        futures = [decoder.submit(b) for b in blobs]
+        results = [f.result() for f in futures]
+        pipeline_times.append(time.perf_counter() - start)
+    decoder.shutdown()
+
+    found_naive = sum(1 for r in naive if r)
+    found_pipeline = sum(1 for r in results if r)
+    print(f"images: {len(paths)}")
+    print(f"naive full-frame   : {naive_time:8.3f}s  {naive_time / len(paths) * 1000:8.1f} ms/img  decoded {found_naive}")
+    for i, t in enumerate(pipeline_times, 1):
+        label = "pipeline (cold)" if i == 1 else f"pipeline (pass {i})"
+        print(f"{label:<19}: {t:8.3f}s  {t / len(paths) * 1000:8.1f} ms/img  decoded {found_pipeline}")
+    mismatches = [p for p, a, b in zip(paths, naive, results) if a and a != b]
+    if mismatches:
+        print(f"results differ from naive decode for {len(mismatches)} image(s): {', '.join(mismatches[:5])}")
+
+
+if __name__ == "__main__":
+    main()
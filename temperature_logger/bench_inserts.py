@@ -0,0 +1,69 @@
+"""Benchmark measurement ingestion: one-by-one inserts vs add_measurements_bulk.
+
+Simulates 8 lines sending ~14 raw samples per 10-second run and reports
+inserts/sec at different commit batch sizes.
+
+Usage: python bench_inserts.py [--runs 2000] [--batch-sizes 1,10,100,1000]
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+
+from data_manager import DataManager
+
+LINES = [f"Línea {i}" for i in range(1, 9)]
+SAMPLES_PER_RUN = 14
+
+
+def make_runs(n):
+    runs = []
+    t0 = time.time()
+    for i in range(n):
+        samples = [(t0 + i * 10 + k * 0.7, round(random.uniform(340, 360), 2)) for k in range(SAMPLES_PER_RUN)]
+        avg = sum(v for _, v in samples) / len(samples)
+        runs.append((LINES[i % len(LINES)], f"FP{i % 50:04d}", f"MN{i % 30:04d}", avg, samples))
+    return runs
+
+
+def bench_single(runs, with_samples):
+    with tempfile.TemporaryDirectory() as tmp:
+        dm = DataManager(os.path.join(tmp, "bench.db"))
+        start = time.perf_counter()
+        for line, src, hnd, temp, samples in runs:
+            dm.add_measurement(line, src, hnd, temp, samples=samples if with_samples else None)
+        return time.perf_counter() - start
+
+
+def bench_bulk(runs, batch_size, with_samples):
+    records = runs if with_samples else [r[:4] for r in runs]
+    with tempfile.TemporaryDirectory() as tmp:
+        dm = DataManager(os.path.join(tmp, "bench.db"))
+        start = time.perf_counter()
+        dm.add_measurements_bulk(records, commit_interval=batch_size)
+        return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=2000)
+    parser.add_argument("--batch-sizes", default="1,10,100,1000")
+    args = parser.parse_args()
+
+    runs = make_runs(args.runs)
+    batch_sizes = [int(b) for b in args.batch_sizes.split(",")]
+
+    print(f"{'mode':<28}{'samples':>8}{'seconds':>10}{'runs/s':>12}{'rows/s':>12}")
+    for with_samples in (False, True):
+        rows_per_run = 1 + (SAMPLES_PER_RUN if with_samples else 0)
+        results = [("add_measurement", bench_single(runs, with_samples))]
+        for batch_size in batch_sizes:
+            results.append((f"bulk commit={batch_size}", bench_bulk(runs, batch_size, with_samples)))
+        for name, elapsed in results:
+            print(f"{name:<28}{'yes' if with_samples else 'no':>8}{elapsed:>10.3f}"
+                  f"{args.runs / elapsed:>12.0f}{args.runs * rows_per_run / elapsed:>12.0f}")
+
+
+if __name__ == "__main__":
+    main()
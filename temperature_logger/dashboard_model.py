@@ -0,0 +1,53 @@
+from query_builder import MeasurementFilter
+
+
+class DashboardModel:
+    """Tracks what a dashboard session already shows so refreshes only fetch and send the difference.
+
+    Rows are (id, timestamp, line, code_source, code_handle, temperature) tuples as
+    returned by DataManager.get_measurements_page / get_measurements_since.
+    """
+
+    def __init__(self):
+        self.filters = None
+        self.last_seen_id = 0
+        self.sources = []
+        self.handles = []
+
+    def filters_changed(self, filters):
+        return self.filters != MeasurementFilter.coerce(filters)
+
+    def reset(self, filters, rows=()):
+        """Start over for a new filter set; `rows` is the first page (newest first)."""
+        self.filters = MeasurementFilter.coerce(filters)
+        self.last_seen_id = max((r[0] for r in rows), default=0)
+
+    def accept_new(self, rows):
+        """Keep only rows newer than what is shown and matching the filters. Returns them newest first."""
+        fresh = [r for r in rows if r[0] > self.last_seen_id and self.matches(r)]
+        if fresh:
+            self.last_seen_id = max(r[0] for r in fresh)
+        fresh.sort(key=lambda r: r[0], reverse=True)
+        return fresh
+
+    def matches(self, row):
+        return self.filters is not None and self.filters.matches(row)
+
+    def update_codes(self, sources, handles):
+        """Store the code catalog; returns True only if it differs from the one already sent."""
+        sources, handles = sorted(sources), sorted(handles)
+        if sources == self.sources and handles == self.handles:
+            return False
+        self.sources, self.handles = sources, handles
+        return True
+
+    def add_codes_from(self, rows):
+        """Extend the catalog with codes seen in new rows. Returns True if anything was added."""
+        sources = set(self.sources)
+        handles = set(self.handles)
+        for r in rows:
+            if r[3]:
+                sources.add(r[3])
+            if r[4]:
+                handles.add(r[4])
+        return self.update_codes(sources, handles)
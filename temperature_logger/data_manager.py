@@ -1,14 +1,116 @@
 import sqlite3
 import datetime
 import os
+import threading
+import collections
+import queue
+from contextlib import contextmanager
+
+from downsample import lttb
+from query_builder import MeasurementFilter, MeasurementQuery
+
+# Summary of a run as produced by run_stats.MeasurementRun.summary()
+STATS_COLUMNS = [
+    ("samples_count", "INTEGER"),
+    ("std_dev", "REAL"),
+    ("min_temp", "REAL"),
+    ("max_temp", "REAL"),
+    ("slope", "REAL"),
+    ("duration", "REAL"),
+    ("stable", "INTEGER"),
+    ("rejected_count", "INTEGER"),
+]
 
 class DataManager:
-    def __init__(self, db_name="temperature_logs.db"):
+    def __init__(self, db_name="temperature_logs.db", commit_interval=500, hub=None, cache_size=128, read_pool_size=4):
         # Force Absolute Path
         base_dir = os.path.dirname(os.path.abspath(__file__))
         self.db_name = os.path.join(base_dir, db_name)
+        # Rows written per transaction by the bulk API
+        self.commit_interval = commit_interval
+        # Optional live_hub.MeasurementHub notified after every insert
+        self.hub = hub
+        # LRU of read results keyed by the normalized query; cleared on every write
+        self.cache_size = cache_size
+        self._cache = collections.OrderedDict()
+        self._cache_lock = threading.Lock()
+        self._cache_generation = 0
+        # Small bounded pool of read connections shared by every thread, instead of
+        # reconnecting per query (or keeping one per thread for the life of the process)
+        self.read_pool_size = read_pool_size
+        self._read_pool = queue.LifoQueue()
+        self._read_conns = []  # Every pooled connection opened, so close() can reach them
+        self._read_lock = threading.Lock()
+        self._closed = False
         self.init_db()
 
+    @contextmanager
+    def _read_conn(self):
+        """Borrow a read connection; blocks while `read_pool_size` are in use by other threads."""
+        if self._closed:
+            # After close(): one-off connection
+            conn = sqlite3.connect(self.db_name)
+            try:
+                yield conn
+            finally:
+                conn.close()
+            return
+        try:
+            conn = self._read_pool.get_nowait()
+        except queue.Empty:
+            conn = None
+            with self._read_lock:
+                if len(self._read_conns) < self.read_pool_size:
+                    conn = sqlite3.connect(self.db_name, check_same_thread=False)
+                    self._read_conns.append(conn)
+            if conn is None:
+                conn = self._read_pool.get()
+        try:
+            yield conn
+        finally:
+            if self._closed:
+                conn.close()
+            else:
+                self._read_pool.put(conn)
+
+    def close(self):
+        """Close the pooled read connections (those in use are closed when returned)."""
+        with self._read_lock:
+            self._closed = True
+            while True:
+                try:
+                    self._read_pool.get_nowait().close()
+                except queue.Empty:
+                    break
+
+    def _cached(self, key, compute):
+        with self._cache_lock:
+            if key in self._cache:
+                self._cache.move_to_end(key)
+                return self._cache[key]
+            generation = self._cache_generation
+        result = compute()
+        with self._cache_lock:
+            # Don't store a result that may predate a write that happened meanwhile
+            if generation == self._cache_generation:
+                self._cache[key] = result
+                if len(self._cache) > self.cache_size:
+                    self._cache.popitem(last=False)
+        return result
+
+    def invalidate_cache(self):
+        with self._cache_lock:
+            self._cache.clear()
+            self._cache_generation += 1
+
+    def query(self, q):
+        """Run a MeasurementQuery through the LRU cache. Returns a list of row tuples."""
+        def run():
+            sql, params = q.to_sql()
+            with self._read_conn() as conn:
+                return conn.execute(sql, params).fetchall()
+        return self._cached(("query", q), run)
+
     def init_db(self):
         """Initialize the database table if it doesn't exist."""
         conn = sqlite3.connect(self.db_name)
@@ -23,20 +125,178 @@ class DataManager:
                 temperature REAL
             )
         ''')
+        # Composite indexes so filtered keyset pages can walk (filter, id) directly
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_measurements_line_id ON measurements (line, id)')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_measurements_source_id ON measurements (code_source, id)')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_measurements_handle_id ON measurements (code_handle, id)')
+        # Every raw sample received during a run, linked to its final measurement
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS raw_samples (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                measurement_id INTEGER NOT NULL REFERENCES measurements(id) ON DELETE CASCADE,
+                sample_index INTEGER,
+                received_at REAL,
+                temperature REAL,
+                rejected INTEGER NOT NULL DEFAULT 0
+            )
+        ''')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_raw_samples_measurement ON raw_samples (measurement_id)')
+        # Samples dropped by the filters are kept too, flagged (databases created before the flag)
+        cursor.execute("PRAGMA table_info(raw_samples)")
+        if "rejected" not in {row[1] for row in cursor.fetchall()}:
+            cursor.execute("ALTER TABLE raw_samples ADD COLUMN rejected INTEGER NOT NULL DEFAULT 0")
+
+        # High-water marks of the background sync (sync_service.SyncEngine)
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS sync_state (
+                name TEXT PRIMARY KEY,
+                last_id INTEGER NOT NULL DEFAULT 0
+            )
+        ''')
+
+        # Log of deleted measurement ids, so the sync can replay deletes remotely
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS deleted_measurements (
+                seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                measurement_id INTEGER NOT NULL,
+                deleted_at TEXT
+            )
+        ''')
+
+        # Run statistics columns (added to existing databases on the fly)
+        cursor.execute("PRAGMA table_info(measurements)")
+        existing = {row[1] for row in cursor.fetchall()}
+        for column, col_type in STATS_COLUMNS:
+            if column not in existing:
+                cursor.execute(f"ALTER TABLE measurements ADD COLUMN {column} {col_type}")
         conn.commit()
         conn.close()
 
-    def add_measurement(self, line, code_source, code_handle, temperature):
-        """Add a new measurement record."""
+    def add_measurement(self, line, code_source, code_handle, temperature, samples=None, stats=None):
+        """Add a new measurement record, optionally with its raw samples and run statistics. Returns the new id."""
         conn = sqlite3.connect(self.db_name)
         cursor = conn.cursor()
         timestamp = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        cursor.execute('''
+        columns = ["timestamp", "line", "code_source", "code_handle", "temperature"]
+        values = [timestamp, line, code_source, code_handle, temperature]
+        if stats:
+            for column, _ in STATS_COLUMNS:
+                if column in stats:
+                    columns.append(column)
+                    values.append(stats[column])
+        cursor.execute(
+            f"INSERT INTO measurements ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})",
+            values
+        )
+        measurement_id = cursor.lastrowid
+        if samples:
+            self._insert_samples(cursor, measurement_id, samples)
+        conn.commit()
+        conn.close()
+        self.invalidate_cache()
+        if self.hub:
+            self.hub.publish([(measurement_id, timestamp, line, code_source, code_handle, temperature)])
+        return measurement_id
+
+    def add_measurements_bulk(self, records, commit_interval=None):
+        """Insert many measurements, committing every `commit_interval` rows.
+
+        Each record is (line, code_source, code_handle, temperature), optionally
+        followed by samples and by the run's timestamp ("YYYY-MM-DD HH:MM:SS" or a
+        datetime; None means now). Returns the ids of the inserted rows, in order.
+        """
+        commit_interval = commit_interval or self.commit_interval
+        now = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        insert_sql = '''
             INSERT INTO measurements (timestamp, line, code_source, code_handle, temperature)
             VALUES (?, ?, ?, ?, ?)
-        ''', (timestamp, line, code_source, code_handle, temperature))
+        '''
+
+        conn = sqlite3.connect(self.db_name)
+        cursor = conn.cursor()
+        ids = []
+        published = []
+        pending = 0
+
+        for record in records:
+            line, code_source, code_handle, temperature = record[:4]
+            samples = record[4] if len(record) > 4 else None
+            timestamp = record[5] if len(record) > 5 else None
+            if timestamp is None:
+                timestamp = now
+            elif isinstance(timestamp, datetime.datetime):
+                timestamp = timestamp.strftime("%Y-%m-%d %H:%M:%S")
+            # The id comes from this insert, not from MAX(id), so concurrent writers can't collide
+            cursor.execute(insert_sql, (timestamp, line, code_source, code_handle, temperature))
+            measurement_id = cursor.lastrowid
+            if samples:
+                self._insert_samples(cursor, measurement_id, samples)
+            ids.append(measurement_id)
+            published.append((measurement_id, timestamp, line, code_source, code_handle, temperature))
+            pending += 1
+
+            if pending >= commit_interval:
+                conn.commit()
+                self.invalidate_cache()
+                pending = 0
+
         conn.commit()
         conn.close()
+        self.invalidate_cache()
+        if self.hub and published:
+            self.hub.publish(published)
+        return ids
+
+    def _insert_samples(self, cursor, measurement_id, samples):
+        """Write raw samples for a run.
+
+        Samples are floats, (received_at, temperature) pairs or
+        (received_at, temperature, rejected) triples; rejected marks readings the
+        filters dropped from the run statistics.
+        """
+        rows = []
+        for i, sample in enumerate(samples):
+            if isinstance(sample, (tuple, list)):
+                received_at, value = sample[0], sample[1]
+                rejected = int(bool(sample[2])) if len(sample) > 2 else 0
+            else:
+                received_at, value, rejected = None, sample, 0
+            rows.append((measurement_id, i, received_at, value, rejected))
+        cursor.executemany(
+            'INSERT INTO raw_samples (measurement_id, sample_index, received_at, temperature, rejected) VALUES (?, ?, ?, ?, ?)',
+            rows
+        )
+
+    def get_raw_samples(self, measurement_id):
+        """Retrieve the raw samples recorded for one measurement run: (sample_index, received_at, temperature, rejected)."""
+        conn = sqlite3.connect(self.db_name)
+        cursor = conn.cursor()
+        cursor.execute('''
+            SELECT sample_index, received_at, temperature, rejected
+            FROM raw_samples
+            WHERE measurement_id = ?
+            ORDER BY sample_index
+        ''', (measurement_id,))
+        rows = cursor.fetchall()
+        conn.close()
+        return rows
+
+    def delete_measurement(self, measurement_id):
+        """Delete a measurement together with its raw samples, logging the id for the sync."""
+        conn = sqlite3.connect(self.db_name)
+        cursor = conn.cursor()
+        cursor.execute('DELETE FROM raw_samples WHERE measurement_id = ?', (measurement_id,))
+        cursor.execute('DELETE FROM measurements WHERE id = ?', (measurement_id,))
+        if cursor.rowcount:
+            cursor.execute(
+                'INSERT INTO deleted_measurements (measurement_id, deleted_at) VALUES (?, ?)',
+                (measurement_id, datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S"))
+            )
+        conn.commit()
+        conn.close()
+        self.invalidate_cache()
+        if self.hub:
+            self.hub.publish_delete([measurement_id])
 
     def get_recent_measurements(self, limit=50):
         """Retrieve recent measurements."""
@@ -52,48 +312,152 @@ class DataManager:
         conn.close()
         return rows
 
-    def get_filtered_measurements(self, line=None, code_source=None, code_handle=None):
-        """Retrieve measurements for dashboard with filters."""
+    def get_measurements_page(self, filters=None, after_id=None, page_size=50):
+        """Retrieve one page of measurements, newest first, using keyset pagination.
+
+        `filters` is a MeasurementFilter or a dict with optional `line`, `code_source`
+        and `code_handle` (exact match, "Todas" means no filter). `after_id` is the
+        cursor returned by the previous page; pass None for the first page.
+        Returns (rows, next_cursor); next_cursor is None when there are no more rows.
+        """
+        rows = self.query(MeasurementQuery(MeasurementFilter.coerce(filters), after_id=after_id, limit=page_size))
+        next_cursor = rows[-1][0] if len(rows) == page_size else None
+        return rows, next_cursor
+
+    def get_measurements_newer_page(self, filters=None, before_id=None, page_size=50):
+        """Retrieve the page just above `before_id` (the next newer rows), newest first.
+
+        Used to page back up towards the newest rows once older pages have
+        pushed them out of a bounded view. Returns (rows, more); `more` is
+        False when these are the newest rows matching `filters`.
+        """
+        # One extra row tells whether there is anything above this page
+        rows = self.query(MeasurementQuery(MeasurementFilter.coerce(filters), descending=False,
+                                           since_id=before_id or 0, limit=page_size + 1))
+        return rows[:page_size][::-1], len(rows) > page_size
+
+    def get_measurements_since(self, filters=None, since_id=0, limit=500):
+        """Retrieve measurements newer than `since_id` (same filters as get_measurements_page), newest first."""
+        return self.query(MeasurementQuery(MeasurementFilter.coerce(filters), since_id=since_id or 0, limit=limit))
+
+    def get_downsampled_series(self, filters=None, start=None, end=None, max_points=200, method="minmax"):
+        """Temperature series for a time range, reduced to at most `max_points` (epoch_seconds, temperature) points.
+
+        `start` / `end` are "YYYY-MM-DD HH:MM:SS" strings (None = open ended).
+        method="minmax" buckets the range in SQL and keeps each bucket's min and max reading;
+        method="lttb" fetches the range and applies Largest-Triangle-Three-Buckets.
+        """
+        flt = MeasurementFilter.coerce(filters)._replace(start=start, end=end)
+        return self._cached(
+            ("series", flt, max_points, method),
+            lambda: self._downsampled_series(flt, max_points, method)
+        )
+
+    def _downsampled_series(self, flt, max_points, method):
+        conditions, params = flt.conditions()
+        where = (" WHERE " + " AND ".join(conditions)) if conditions else ""
+
+        with self._read_conn() as conn:
+            return self._series_from(conn.cursor(), where, params, max_points, method)
+
+    def _series_from(self, cursor, where, params, max_points, method):
+        cursor.execute(
+            "SELECT COUNT(*), MIN(CAST(strftime('%s', timestamp) AS INTEGER)), MAX(CAST(strftime('%s', timestamp) AS INTEGER))"
+            " FROM measurements" + where, tuple(params)
+        )
+        count, t_min, t_max = cursor.fetchone()
+
+        if not count:
+            series = []
+        elif method == "lttb" or count <= max_points:
+            cursor.execute(
+                "SELECT CAST(strftime('%s', timestamp) AS INTEGER), temperature FROM measurements"
+                + where + " ORDER BY id ASC", tuple(params)
+            )
+            series = lttb(cursor.fetchall(), max_points)
+        else:
+            buckets = max(max_points // 2, 1)
+            width = max((t_max - t_min) / buckets, 1e-9)
+            bucket_expr = f"MIN(CAST((CAST(strftime('%s', timestamp) AS INTEGER) - {t_min}) / {width} AS INTEGER), {buckets - 1})"
+            series = []
+            # SQLite returns the other columns from the row holding the MIN()/MAX()
+            for agg in ("MIN", "MAX"):
+                cursor.execute(
+                    f"SELECT {bucket_expr} AS bucket, {agg}(temperature), CAST(strftime('%s', timestamp) AS INTEGER), id"
+                    " FROM measurements" + where + " GROUP BY bucket", tuple(params)
+                )
+                series.extend(cursor.fetchall())
+            # One point per distinct row, in time order
+            unique = {}
+            for bucket, temp, t, rid in series:
+                unique[rid] = (t, temp)
+            series = [unique[rid] for rid in sorted(unique)]
+        return series
+
+    def get_measurements_after(self, after_id, limit=100):
+        """Retrieve full measurement rows with id > after_id, oldest first (sync batches)."""
         conn = sqlite3.connect(self.db_name)
+        conn.row_factory = sqlite3.Row
         cursor = conn.cursor()
-        
-        query = "SELECT timestamp, temperature FROM measurements"
-        conditions = []
-        params = []
-        
-        if line and line != "Todas":
-            conditions.append("line = ?")
-            params.append(line)
-        if code_source:
-             conditions.append("code_source LIKE ?")
-             params.append(f"%{code_source}%")
-        if code_handle:
-             conditions.append("code_handle LIKE ?")
-             params.append(f"%{code_handle}%")
-             
-        if conditions:
-            query += " WHERE " + " AND ".join(conditions)
-            
-        query += " ORDER BY id ASC" # Ascending for charts
-        
-        cursor.execute(query, tuple(params))
+        cursor.execute('''
+            SELECT * FROM measurements
+            WHERE id > ?
+            ORDER BY id ASC
+            LIMIT ?
+        ''', (after_id, limit))
+        rows = [dict(r) for r in cursor.fetchall()]
+        conn.close()
+        return rows
+
+    def get_deletions_after(self, after_seq, limit=100):
+        """Retrieve logged deletes with seq > after_seq, oldest first, as (seq, measurement_id) pairs."""
+        conn = sqlite3.connect(self.db_name)
+        cursor = conn.cursor()
+        cursor.execute('''
+            SELECT seq, measurement_id FROM deleted_measurements
+            WHERE seq > ?
+            ORDER BY seq ASC
+            LIMIT ?
+        ''', (after_seq, limit))
         rows = cursor.fetchall()
         conn.close()
         return rows
 
-    def get_unique_codes(self):
-        """Get unique sources and handles for dropdowns."""
+    def get_sync_cursor(self, name):
+        """Last id (measurement id, or delete-log seq) already pushed to the remote `name`."""
         conn = sqlite3.connect(self.db_name)
         cursor = conn.cursor()
-        
-        cursor.execute("SELECT DISTINCT code_source FROM measurements WHERE code_source IS NOT NULL AND code_source != ''")
-        sources = [row[0] for row in cursor.fetchall()]
-        
-        cursor.execute("SELECT DISTINCT code_handle FROM measurements WHERE code_handle IS NOT NULL AND code_handle != ''")
-        handles = [row[0] for row in cursor.fetchall()]
-        
+        cursor.execute('SELECT last_id FROM sync_state WHERE name = ?', (name,))
+        row = cursor.fetchone()
         conn.close()
-        return sources, handles
+        return row[0] if row else 0
+
+    def set_sync_cursor(self, name, last_id):
+        conn = sqlite3.connect(self.db_name)
+        cursor = conn.cursor()
+        cursor.execute(
+            'INSERT INTO sync_state (name, last_id) VALUES (?, ?) ON CONFLICT(name) DO UPDATE SET last_id = excluded.last_id',
+            (name, last_id)
+        )
+        conn.commit()
+        conn.close()
+
+    def get_filtered_measurements(self, line=None, code_source=None, code_handle=None):
+        """Retrieve measurements for dashboard with filters (codes matched as substrings)."""
+        flt = MeasurementFilter(line, code_source, code_handle, match="contains").normalized()
+        return self.query(MeasurementQuery(flt, columns=("timestamp", "temperature"), descending=False)) # Ascending for charts
+
+    def get_unique_codes(self):
+        """Get unique sources and handles for dropdowns."""
+        def run():
+            with self._read_conn() as conn:
+                cursor = conn.cursor()
+                cursor.execute("SELECT DISTINCT code_source FROM measurements WHERE code_source IS NOT NULL AND code_source != ''")
+                sources = [row[0] for row in cursor.fetchall()]
+                cursor.execute("SELECT DISTINCT code_handle FROM measurements WHERE code_handle IS NOT NULL AND code_handle != ''")
+                handles = [row[0] for row in cursor.fetchall()]
+            return sources, handles
+        return self._cached(("codes",), run)
 
     def execute_query(self, query, params=()):
         """Execute a raw query and return results (for READ) or commit (for WRITE)."""
@@ -101,11 +465,13 @@ class DataManager:
         cursor = conn.cursor()
         cursor.execute(query, params)
         
-        if query.strip().upper().startswith("SELECT"):
+        # Statements that produce rows have a description (SELECT, WITH ..., PRAGMA)
+        if cursor.description is not None:
             rows = cursor.fetchall()
             conn.close()
             return rows
         else:
             conn.commit()
             conn.close()
+            self.invalidate_cache()
             return None
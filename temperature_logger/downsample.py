@@ -0,0 +1,37 @@
+def lttb(points, threshold):
+    """Largest-Triangle-Three-Buckets downsampling.
+
+    `points` is a list of (x, y) sorted by x. Returns at most `threshold`
+    points that keep the visual shape (peaks and dips) of the series.
+    """
+    n = len(points)
+    if threshold >= n or threshold < 3:
+        return list(points)
+
+    sampled = [points[0]]
+    bucket_size = (n - 2) / (threshold - 2)
+    a = 0
+    for i in range(threshold - 2):
+        # Average of the next bucket is the third vertex of the triangle
+        next_start = int((i + 1) * bucket_size) + 1
+        next_end = min(int((i + 2) * bucket_size) + 1, n)
+        span = next_end - next_start
+        avg_x = sum(p[0] for p in points[next_start:next_end]) / span
+        avg_y = sum(p[1] for p in points[next_start:next_end]) / span
+
+        start = int(i * bucket_size) + 1
+        end = int((i + 1) * bucket_size) + 1
+        ax, ay = points[a]
+        best_area = -1.0
+        best = start
+        for j in range(start, end):
+            x, y = points[j]
+            area = abs((ax - avg_x) * (y - ay) - (ax - x) * (avg_y - ay))
+            if area > best_area:
+                best_area = area
+                best = j
+        sampled.append(points[best])
+        a = best
+
+    sampled.append(points[-1])
+    return sampled
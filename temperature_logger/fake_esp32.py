@@ -0,0 +1,55 @@
+"""Local stand-in for the ESP32 firmware TCP stream.
+
+Each connected client receives one temperature per line every `--interval`
+seconds, in the same format as the firmware's `client.println(dataLine)`
+("350.25\\r\\n"). Start several on different ports to simulate all 8 lines.
+
+Usage: python fake_esp32.py --ports 8080,8081 [--base 350] [--noise 1.5] [--interval 0.7]
+"""
+import argparse
+import asyncio
+import random
+
+
+def make_handler(base, noise, interval):
+    async def handle(reader, writer):
+        try:
+            while True:
+                value = base + random.uniform(-noise, noise)
+                writer.write(f"{value:.2f}\r\n".encode())
+                await writer.drain()
+                await asyncio.sleep(interval)
+        except (ConnectionError, asyncio.CancelledError):
+            pass
+        finally:
+            writer.close()
+    return handle
+
+
+async def serve(ports, base=350.0, noise=1.5, interval=0.7, host="127.0.0.1"):
+    """Start one fake device per port and return the asyncio servers."""
+    servers = []
+    for i, port in enumerate(ports):
+        handler = make_handler(base + i, noise, interval)
+        servers.append(await asyncio.start_server(handler, host, port))
+    return servers
+
+
+async def main(args):
+    ports = [int(p) for p in args.ports.split(",")]
+    servers = await serve(ports, args.base, args.noise, args.interval, args.host)
+    print(f"Fake ESP32 streaming on {args.host}:{', '.join(map(str, ports))}")
+    await asyncio.gather(*(s.serve_forever() for s in servers))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--ports", default="8080")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--base", type=float, default=350.0)
+    parser.add_argument("--noise", type=float, default=1.5)
+    parser.add_argument("--interval", type=float, default=0.7)
+    try:
+        asyncio.run(main(parser.parse_args()))
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,106 @@
+"""Framing and parsing of the ESP32 reading stream (one `println` per reading)."""
+
+
+# Whitespace bytes around a reading (println ends lines with \r\n)
+_SPACE = frozenset(b" \t\r")
+_POW10 = [10.0 ** i for i in range(23)]
+
+
+def parse_reading(buf, start, end):
+    """Parse the reading in buf[start:end] without slicing. Returns a float or None.
+
+    Plain decimals ("-25.50") are parsed digit by digit; anything else (nan,
+    exponents) falls back to float() on a copy, which the firmware never sends
+    in normal operation.
+    """
+    while start < end and buf[start] in _SPACE:
+        start += 1
+    while end > start and buf[end - 1] in _SPACE:
+        end -= 1
+    if start == end:
+        return None
+    i = start
+    negative = buf[i] == 45  # '-'
+    if negative or buf[i] == 43:  # '+'
+        i += 1
+    mantissa = 0
+    scale = -1
+    digits = 0
+    while i < end:
+        c = buf[i]
+        if 48 <= c <= 57:
+            mantissa = mantissa * 10 + (c - 48)
+            digits += 1
+            if scale >= 0:
+                scale += 1
+        elif c == 46 and scale < 0:  # '.'
+            scale = 0
+        else:
+            break
+        i += 1
+    if i == end and digits and scale < len(_POW10) and mantissa < 1 << 53:
+        # Exact integer over an exact power of ten: same result as float(text)
+        value = mantissa / _POW10[scale] if scale > 0 else float(mantissa)
+        return -value if negative else value
+    try:
+        return float(bytes(buf[start:end]))
+    except ValueError:
+        return None
+
+
+class LineParser:
+    """Frames the ESP32 stream into readings.
+
+    Bytes land in one preallocated buffer (copied in by `feed`, or written
+    directly at `writable()` and accounted with `commit`); each complete line is parsed in place and appended to the
+    caller's `array('d')` outputs, so no per-line or per-call objects are
+    created. A partial line stays in the buffer until the rest arrives.
+    """
+
+    def __init__(self, capacity=4096):
+        self.buffer = bytearray(capacity)
+        self.view = memoryview(self.buffer)
+        self.size = 0
+
+    def writable(self):
+        """Free space at the end of the buffer (e.g. for recv_into / buffered protocols)."""
+        if self.size == len(self.buffer):
+            # A "line" longer than the whole buffer is garbage: drop it
+            self.size = 0
+        return self.view[self.size:]
+
+    def feed(self, data, received_at, times, values):
+        """Copy `data` in and parse it. Returns the number of readings appended."""
+        count = 0
+        data = memoryview(data)
+        while len(data):
+            free = self.writable()
+            n = min(len(free), len(data))
+            free[:n] = data[:n]
+            data = data[n:]
+            count += self.commit(n, received_at, times, values)
+        return count
+
+    def commit(self, n, received_at, times, values):
+        """Account for `n` bytes written at `writable()` and parse every complete line."""
+        buf = self.buffer
+        scan_from = self.size
+        self.size += n
+        count = 0
+        start = 0
+        while True:
+            end = buf.find(b"\n", scan_from, self.size)
+            if end < 0:
+                break
+            value = parse_reading(buf, start, end)
+            if value is not None:
+                times.append(received_at)
+                values.append(value)
+                count += 1
+            start = scan_from = end + 1
+        if start:
+            remaining = self.size - start
+            if remaining:
+                self.view[:remaining] = self.view[start:self.size]
+            self.size = remaining
+        return count
@@ -0,0 +1,79 @@
+import queue
+import threading
+
+
+class MeasurementHub:
+    """In-process pub/sub for new and deleted measurements.
+
+    DataManager publishes each inserted row (and each deleted id) once; every
+    connected dashboard session subscribes callbacks and applies the change
+    locally, so one write fans out to N clients in memory instead of N clients
+    polling the database.
+    Delivery happens on a dispatcher thread so a slow session never blocks the writer.
+    """
+
+    def __init__(self):
+        self._subscribers = {}
+        self._next_token = 0
+        self._lock = threading.Lock()
+        self._queue = queue.Queue()
+        self._thread = None
+
+    def subscribe(self, callback, on_delete=None):
+        """Register `callback(rows)`; rows are (id, timestamp, line, code_source, code_handle, temperature).
+
+        `on_delete(ids)` receives the ids of deleted measurements. Returns an unsubscribe function.
+        """
+        with self._lock:
+            token = self._next_token
+            self._next_token += 1
+            self._subscribers[token] = (callback, on_delete)
+            if not self._thread:
+                self._thread = threading.Thread(target=self._dispatch, daemon=True)
+                self._thread.start()
+        return lambda: self.unsubscribe(token)
+
+    def unsubscribe(self, token):
+        with self._lock:
+            self._subscribers.pop(token, None)
+
+    def publish(self, rows):
+        if rows:
+            self._enqueue("insert", list(rows))
+
+    def publish_delete(self, ids):
+        if ids:
+            self._enqueue("delete", list(ids))
+
+    def _enqueue(self, kind, payload):
+        # Delivered to the sessions subscribed at publish time (snapshot taken under the lock)
+        with self._lock:
+            subscribers = list(self._subscribers.items())
+        if subscribers:
+            self._queue.put((kind, payload, subscribers))
+
+    @property
+    def subscriber_count(self):
+        with self._lock:
+            return len(self._subscribers)
+
+    def _dispatch(self):
+        while True:
+            kind, payload, subscribers = self._queue.get()
+            for token, (on_insert, on_delete) in subscribers:
+                with self._lock:
+                    if token not in self._subscribers:
+                        continue  # Unsubscribed since the publish
+                callback = on_insert if kind == "insert" else on_delete
+                if callback is None:
+                    continue
+                try:
+                    callback(payload)
+                except Exception as e:
+                    # A closed session: stop delivering to it
+                    print(f"Hub subscriber dropped: {e}")
+                    self.unsubscribe(token)
+
+
+# Shared by every session served by this process
+hub = MeasurementHub()
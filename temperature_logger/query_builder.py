@@ -0,0 +1,116 @@
+from typing import NamedTuple, Optional, Tuple
+
+# Row layout used by the dashboard and the live hub
+ROW_COLUMNS = ("id", "timestamp", "line", "code_source", "code_handle", "temperature")
+
+# Values the dropdowns use for "no filter"
+_ANY = (None, "", "Todas")
+
+
+class MeasurementFilter(NamedTuple):
+    """Typed, hashable measurement filter shared by the dashboard and DataManager.
+
+    match="exact" compares codes with `=` (dashboard dropdowns, index friendly),
+    match="contains" uses LIKE %value% (free-text search).
+    `start` / `end` bound the timestamp ("YYYY-MM-DD HH:MM:SS").
+    """
+
+    line: Optional[str] = None
+    code_source: Optional[str] = None
+    code_handle: Optional[str] = None
+    match: str = "exact"
+    start: Optional[str] = None
+    end: Optional[str] = None
+
+    @classmethod
+    def coerce(cls, filters):
+        """Accept a MeasurementFilter, a dict with the same keys, or None; returns a normalized filter."""
+        if filters is None:
+            return cls()
+        if isinstance(filters, dict):
+            filters = cls(**{k: v for k, v in filters.items() if k in cls._fields})
+        return filters.normalized()
+
+    def normalized(self):
+        # "Todas" / "" mean no filter, so equivalent views share one cache entry
+        return self._replace(
+            line=None if self.line in _ANY else self.line,
+            code_source=None if self.code_source in _ANY else self.code_source,
+            code_handle=None if self.code_handle in _ANY else self.code_handle,
+        )
+
+    def conditions(self):
+        """SQL conditions in canonical column order, with their parameters."""
+        conditions = []
+        params = []
+        if self.line is not None:
+            conditions.append("line = ?")
+            params.append(self.line)
+        for column in ("code_source", "code_handle"):
+            value = getattr(self, column)
+            if value is None:
+                continue
+            if self.match == "contains":
+                conditions.append(f"{column} LIKE ?")
+                params.append(f"%{value}%")
+            else:
+                conditions.append(f"{column} = ?")
+                params.append(value)
+        if self.start:
+            conditions.append("timestamp >= ?")
+            params.append(self.start)
+        if self.end:
+            conditions.append("timestamp <= ?")
+            params.append(self.end)
+        return conditions, params
+
+    def matches(self, row):
+        """Check an in-memory row (ROW_COLUMNS layout) against the filter."""
+        for column, value in (("line", row[2]), ("code_source", row[3]), ("code_handle", row[4])):
+            wanted = getattr(self, column)
+            if wanted is None:
+                continue
+            if self.match == "contains" and column != "line":
+                if wanted not in (value or ""):
+                    return False
+            elif wanted != value:
+                return False
+        if self.start and row[1] < self.start:
+            return False
+        if self.end and row[1] > self.end:
+            return False
+        return True
+
+
+class MeasurementQuery(NamedTuple):
+    """A read over `measurements`, rendered to canonical SQL by `to_sql`.
+
+    Keyset bounds (`after_id` = older than, `since_id` = newer than) walk
+    the primary key, and ordering is always by id so SQLite can use the
+    (column, id) indexes.
+    """
+
+    filter: MeasurementFilter = MeasurementFilter()
+    columns: Tuple[str, ...] = ROW_COLUMNS
+    descending: bool = True
+    after_id: Optional[int] = None
+    since_id: Optional[int] = None
+    limit: Optional[int] = None
+
+    def to_sql(self):
+        conditions, params = self.filter.conditions()
+        if self.after_id is not None:
+            conditions.append("id < ?")
+            params.append(self.after_id)
+        if self.since_id is not None:
+            conditions.append("id > ?")
+            params.append(self.since_id)
+
+        sql = f"SELECT {', '.join(self.columns)} FROM measurements"
+        if conditions:
+            sql += " WHERE " + " AND ".join(conditions)
+        sql += " ORDER BY id " + ("DESC" if self.descending else "ASC")
+        if self.limit is not None:
+            sql += " LIMIT ?"
+            params.append(self.limit)
+        return sql, tuple(params)
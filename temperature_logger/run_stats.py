@@ -0,0 +1,162 @@
+import math
+from array import array
+
+from sample_filters import FilterChain
+
+
+class RunStats:
+    """Online statistics for one measurement run, O(1) state per run.
+
+    - Welford mean / variance, min / max over the whole run
+    - EWMA of the temperature and of its squared deviation (recent noise)
+    - Exponentially weighted least-squares slope (°C/s) for trend detection
+
+    `is_stable()` reports when the recent readings have settled within
+    `tolerance` °C and the trend is flatter than `slope_tolerance` °C/s, so
+    the caller can end the run early.
+    """
+
+    def __init__(self, alpha=0.3, tolerance=0.5, slope_tolerance=0.05, min_samples=5, min_duration=3.0):
+        self.alpha = alpha
+        self.tolerance = tolerance
+        self.slope_tolerance = slope_tolerance
+        self.min_samples = min_samples
+        self.min_duration = min_duration
+        self.reset()
+
+    def reset(self):
+        self.count = 0
+        self.mean = 0.0
+        self._m2 = 0.0
+        self.min = None
+        self.max = None
+        self.ewma = None
+        self.ewm_var = 0.0
+        self.first_t = None
+        self.last_t = None
+        # Decayed sums for the weighted regression (t relative to first_t)
+        self._sw = self._st = self._sv = self._stt = self._stv = 0.0
+
+    def add(self, value, t):
+        """Feed one reading taken at time `t` (seconds)."""
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self._m2 += delta * (value - self.mean)
+
+        if self.min is None or value < self.min:
+            self.min = value
+        if self.max is None or value > self.max:
+            self.max = value
+
+        if self.ewma is None:
+            self.ewma = value
+            self.first_t = t
+        else:
+            diff = value - self.ewma
+            self.ewma += self.alpha * diff
+            self.ewm_var = (1 - self.alpha) * (self.ewm_var + self.alpha * diff * diff)
+        self.last_t = t
+
+        decay = 1 - self.alpha
+        x = t - self.first_t
+        self._sw = self._sw * decay + 1
+        self._st = self._st * decay + x
+        self._sv = self._sv * decay + value
+        self._stt = self._stt * decay + x * x
+        self._stv = self._stv * decay + x * value
+
+    @property
+    def variance(self):
+        return self._m2 / (self.count - 1) if self.count > 1 else 0.0
+
+    @property
+    def std_dev(self):
+        return math.sqrt(self.variance)
+
+    @property
+    def slope(self):
+        denom = self._sw * self._stt - self._st * self._st
+        if self.count < 2 or denom <= 1e-12:
+            return 0.0
+        return (self._sw * self._stv - self._st * self._sv) / denom
+
+    @property
+    def duration(self):
+        return (self.last_t - self.first_t) if self.count else 0.0
+
+    def is_stable(self):
+        if self.count < self.min_samples or self.duration < self.min_duration:
+            return False
+        return math.sqrt(self.ewm_var) <= self.tolerance and abs(self.slope) <= self.slope_tolerance
+
+    def as_dict(self):
+        """Summary stored alongside the measurement."""
+        return {
+            "samples_count": self.count,
+            "mean": self.mean,
+            "std_dev": self.std_dev,
+            "min_temp": self.min,
+            "max_temp": self.max,
+            "ewma": self.ewma,
+            "slope": self.slope,
+            "duration": self.duration,
+            "stable": self.is_stable(),
+        }
+
+
+class MeasurementRun:
+    """One measurement run: every raw reading, its filter verdict and the statistics of the accepted ones.
+
+    Filled by AcquisitionService.measure and stored by DataManager (raw_samples
+    plus the summary columns). Raw readings are kept in arrays reused across
+    runs; rejected ones are flagged, not dropped.
+    """
+
+    def __init__(self, filters=None, stats=None):
+        self.filters = filters or FilterChain.default()
+        self.stats = stats or RunStats()
+        self.times = array("d")
+        self.values = array("d")
+        self.rejected = array("b")
+        self.latest = None  # Last accepted value
+
+    def reset(self):
+        del self.times[:]
+        del self.values[:]
+        del self.rejected[:]
+        self.latest = None
+        self.stats.reset()
+        self.filters.reset()
+
+    def add(self, received_at, raw):
+        """Record one raw reading. Returns the accepted value, or None when a filter rejected it."""
+        value = self.filters.apply(raw)
+        self.times.append(received_at)
+        self.values.append(raw)
+        self.rejected.append(value is None)
+        if value is not None:
+            self.stats.add(value, received_at)
+            self.latest = value
+        return value
+
+    def samples(self):
+        """(received_at, value, rejected) for every raw reading, as stored in raw_samples."""
+        return list(zip(self.times, self.values, self.rejected))
+
+    def summary(self):
+        """Run statistics plus filter metrics, as stored with the measurement."""
+        summary = self.stats.as_dict()
+        summary["rejected_count"] = self.filters.rejected_count
+        summary["fault_count"] = self.filters.fault_count
+        return summary
+
+    @property
+    def valid(self):
+        """False when no reading was accepted (faulty probe, link lost): there is no temperature to save."""
+        return self.stats.count > 0
+
+    @property
+    def average(self):
+        # Run average (Welford mean over every accepted reading); None for an invalid run
+        return self.stats.mean if self.valid else None
@@ -0,0 +1,129 @@
+import collections
+import math
+
+
+class RangeFilter:
+    """Rejects NaN/inf and readings outside the physically plausible range.
+
+    An open or shorted thermocouple on the MAX31856 shows up as NaN or as a
+    value far outside the process range.
+    """
+
+    name = "range"
+
+    def __init__(self, min_value=0.0, max_value=600.0):
+        self.min_value = min_value
+        self.max_value = max_value
+
+    def reset(self):
+        pass
+
+    def apply(self, value):
+        if math.isnan(value) or math.isinf(value):
+            return None
+        if value < self.min_value or value > self.max_value:
+            return None
+        return value
+
+
+def _median(ordered):
+    n = len(ordered)
+    mid = n // 2
+    return ordered[mid] if n % 2 else (ordered[mid - 1] + ordered[mid]) / 2
+
+
+class HampelFilter:
+    """Rejects spikes further than `n_sigmas` scaled MADs from the median of the last `window` raw readings.
+
+    Every reading enters the window, rejected or not, so after a real level
+    change the median follows the new level within half a window instead of
+    locking the filter out. `min_deviation` (°C) is a floor on the threshold:
+    with a near-flat signal the MAD collapses and ordinary probe noise
+    (±1.5 °C on the MAX31856) would otherwise be flagged.
+    """
+
+    name = "hampel"
+
+    def __init__(self, window=11, n_sigmas=3.5, min_deviation=3.0, min_samples=5):
+        self.window = window
+        self.n_sigmas = n_sigmas
+        self.min_deviation = min_deviation
+        self.min_samples = min_samples
+        self.history = collections.deque(maxlen=window)
+
+    def reset(self):
+        self.history.clear()
+
+    def apply(self, value):
+        history = self.history
+        accepted = True
+        if len(history) >= self.min_samples:
+            ordered = sorted(history)
+            median = _median(ordered)
+            mad = _median(sorted(abs(v - median) for v in ordered))
+            threshold = max(self.n_sigmas * 1.4826 * mad, self.min_deviation)
+            accepted = abs(value - median) <= threshold
+        history.append(value)
+        return value if accepted else None
+
+
+class MedianFilter:
+    """Replaces each reading by the median of the last `n` readings (smoothing, never rejects)."""
+
+    name = "median"
+
+    def __init__(self, n=3):
+        self.history = collections.deque(maxlen=n)
+
+    def reset(self):
+        self.history.clear()
+
+    def apply(self, value):
+        self.history.append(value)
+        ordered = sorted(self.history)
+        return ordered[len(ordered) // 2]
+
+
+class FilterChain:
+    """Runs each reading through the filters in order and counts what gets dropped.
+
+    `apply` returns the (possibly smoothed) value, or None when a filter rejected it.
+    `rejected` holds a count per filter name so bad probe contact is visible in the run summary:
+    "range" counts fault readings (open/shorted thermocouple), "hampel" isolated spikes.
+    """
+
+    def __init__(self, filters=None):
+        self.filters = list(filters or [])
+        self.accepted = 0
+        self.rejected = collections.Counter()
+
+    @classmethod
+    def default(cls):
+        return cls([RangeFilter(), HampelFilter()])
+
+    def reset(self):
+        self.accepted = 0
+        self.rejected.clear()
+        for f in self.filters:
+            f.reset()
+
+    def apply(self, value):
+        for f in self.filters:
+            value = f.apply(value)
+            if value is None:
+                self.rejected[f.name] += 1
+                return None
+        self.accepted += 1
+        return value
+
+    @property
+    def rejected_count(self):
+        return sum(self.rejected.values())
+
+    @property
+    def fault_count(self):
+        """Readings outside the plausible range: the signature of a bad thermocouple contact."""
+        return self.rejected[RangeFilter.name]
+
+    def metrics(self):
+        return {"accepted": self.accepted, "rejected": dict(self.rejected), "rejected_count": self.rejected_count}
@@ -0,0 +1,94 @@
+import os
+import secrets
+import tempfile
+import threading
+import time
+
+# Images up to this size are decoded straight from memory
+MAX_IN_MEMORY = 8 * 1024 * 1024
+# Anything above this is refused
+MAX_UPLOAD = 32 * 1024 * 1024
+# Pending upload tokens expire if the browser never sends the file
+TOKEN_TTL = 300
+
+
+class UploadTooLarge(Exception):
+    pass
+
+
+class ScanUploads:
+    """Routes camera uploads straight into the barcode decoder without going through uploads/.
+
+    A session registers a callback and gets a one-time token; the browser
+    PUTs the image to `/scan_upload/<token>`, the body is collected in memory
+    (spooled to a temp file only above MAX_IN_MEMORY) and handed to the
+    decoder, whose result goes to the callback.
+    """
+
+    def __init__(self, decoder):
+        self.decoder = decoder
+        self._pending = {}
+        self._lock = threading.Lock()
+
+    def register(self, callback):
+        """Reserve an upload slot; `callback(code, error)` receives the decoded text (or None) and the decode error, if any."""
+        token = secrets.token_urlsafe(16)
+        now = time.time()
+        with self._lock:
+            self._pending = {t: v for t, v in self._pending.items() if now - v[1] < TOKEN_TTL}
+            self._pending[token] = (callback, now)
+        return token
+
+    def take(self, token):
+        with self._lock:
+            entry = self._pending.pop(token, None)
+        return entry[0] if entry else None
+
+    async def receive(self, token, chunks):
+        """Consume an async iterator of body chunks for `token`. Returns an HTTP status code."""
+        callback = self.take(token)
+        if callback is None:
+            return 404
+
+        buffer = bytearray()
+        spool = None
+        total = 0
+        try:
+            async for chunk in chunks:
+                total += len(chunk)
+                if total > MAX_UPLOAD:
+                    raise UploadTooLarge(f"la imagen supera {MAX_UPLOAD // (1024 * 1024)} MB")
+                if spool is None and total > MAX_IN_MEMORY:
+                    # Oversized photo: continue on disk instead of growing the buffer
+                    spool = tempfile.NamedTemporaryFile(prefix="scan_", delete=False)
+                    spool.write(buffer)
+                    buffer = None
+                if spool is not None:
+                    spool.write(chunk)
+                else:
+                    buffer += chunk
+        except Exception as e:
+            if spool is not None:
+                spool.close()
+                os.remove(spool.name)
+            # The session is waiting on this token: tell it the upload failed
+            callback(None, e)
+            if isinstance(e, UploadTooLarge):
+                return 413
+            raise
+
+        if spool is None:
+            self.decoder.submit(bytes(buffer), callback)
+        else:
+            spool.close()
+            path = spool.name
+
+            def done(code, error):
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+                callback(code, error)
+
+            self.decoder.submit(path, done)
+        return 200
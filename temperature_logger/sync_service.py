@@ -0,0 +1,175 @@
+import random
+import threading
+import time
+from abc import ABC, abstractmethod
+
+
+class RemoteBackend(ABC):
+    """Destination of the background sync. Methods must raise on failure so the batch is retried.
+
+    Both operations must be idempotent: after a failure the same batch is sent
+    again, possibly after part of it was already applied remotely.
+    """
+
+    name = "remote"
+
+    @abstractmethod
+    def push(self, rows):
+        """Upsert a batch of measurement rows (dicts with every local column, id included, oldest first)."""
+
+    @abstractmethod
+    def delete(self, ids):
+        """Remove the measurements with these local ids (missing ids are not an error)."""
+
+
+class SupabaseBackend(RemoteBackend):
+    """Mirrors the local rows into a Supabase table through a supabase-py client.
+
+    Rows are upserted on `id`, so the remote table keeps the local ids,
+    timestamps and run statistics, and a retried batch overwrites instead of
+    duplicating.
+    """
+
+    def __init__(self, client, table="measurements", name="supabase"):
+        self.client = client
+        self.table = table
+        self.name = name
+
+    def push(self, rows):
+        self.client.table(self.table).upsert(rows, on_conflict="id").execute()
+
+    def delete(self, ids):
+        self.client.table(self.table).delete().in_("id", list(ids)).execute()
+
+
+class FakeBackend(RemoteBackend):
+    """In-memory stand-in for the cloud, with optional random failures, for local runs and checks."""
+
+    def __init__(self, failure_rate=0.0, latency=0.0, name="fake"):
+        self.failure_rate = failure_rate
+        self.latency = latency
+        self.name = name
+        self.rows = {}
+        self.calls = 0
+
+    def _call(self):
+        self.calls += 1
+        if self.latency:
+            time.sleep(self.latency)
+        if random.random() < self.failure_rate:
+            raise ConnectionError("fake backend unavailable")
+
+    def push(self, rows):
+        self._call()
+        for row in rows:
+            # Keyed by local id, so a retried batch is idempotent
+            self.rows[row["id"]] = dict(row)
+
+    def delete(self, ids):
+        self._call()
+        for rid in ids:
+            self.rows.pop(rid, None)
+
+
+class SyncEngine:
+    """Pushes locally stored measurements to a remote backend in the background.
+
+    The local SQLite DataManager is the write-ahead store: readings are
+    saved there first and never lost if the network is down. A daemon thread
+    sends rows after the persisted high-water mark (`sync_state`) in batches,
+    then replays the delete log the same way under its own mark, advancing
+    each mark only after a successful push and backing off exponentially
+    while the backend keeps failing.
+    """
+
+    def __init__(self, data_manager, backend, batch_size=100, interval=5.0, max_backoff=300.0):
+        self.db = data_manager
+        self.backend = backend
+        self.batch_size = batch_size
+        self.interval = interval
+        self.max_backoff = max_backoff
+        self.last_error = None
+        self.pushed = 0
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+
+    @property
+    def cursor(self):
+        return self.db.get_sync_cursor(self.backend.name)
+
+    @property
+    def delete_cursor(self):
+        return self.db.get_sync_cursor(f"{self.backend.name}:deletes")
+
+    def sync_once(self):
+        """Push every pending batch of rows, then of deletes. Returns how many changes were pushed; raises if the backend fails."""
+        return self._push_rows() + self._push_deletes()
+
+    def _push_rows(self):
+        pushed = 0
+        last_id = self.cursor
+        while True:
+            rows = self.db.get_measurements_after(last_id, self.batch_size)
+            if not rows:
+                return pushed
+            self.backend.push(rows)
+            last_id = rows[-1]["id"]
+            self.db.set_sync_cursor(self.backend.name, last_id)
+            pushed += len(rows)
+            self.pushed += len(rows)
+            if len(rows) < self.batch_size:
+                return pushed
+
+    def _push_deletes(self):
+        # Runs after the rows: a row deleted while its batch was in flight is
+        # upserted first and then removed, never left behind remotely
+        pushed = 0
+        name = f"{self.backend.name}:deletes"
+        last_seq = self.delete_cursor
+        while True:
+            deletions = self.db.get_deletions_after(last_seq, self.batch_size)
+            if not deletions:
+                return pushed
+            self.backend.delete([measurement_id for _, measurement_id in deletions])
+            last_seq = deletions[-1][0]
+            self.db.set_sync_cursor(name, last_seq)
+            pushed += len(deletions)
+            if len(deletions) < self.batch_size:
+                return pushed
+
+    def notify(self):
+        """Hint that new rows were written so the next push happens right away."""
+        self._wake.set()
+
+    def pending(self):
+        return (len(self.db.get_measurements_after(self.cursor, self.batch_size))
+                + len(self.db.get_deletions_after(self.delete_cursor, self.batch_size)))
+
+    def _run(self):
+        delay = self.interval
+        while not self._stop.is_set():
+            try:
+                self.sync_once()
+                self.last_error = None
+                delay = self.interval
+            except Exception as e:
+                self.last_error = str(e)
+                print(f"Sync error ({self.backend.name}): {e}")
+                delay = min(delay * 2, self.max_backoff)
+            self._wake.wait(delay)
+            self._wake.clear()
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=2.0):
+        self._stop.set()
+        self._wake.set()
+        if self._thread:
+            self._thread.join(timeout)
+            self._thread = None
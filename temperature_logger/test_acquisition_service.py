@@ -0,0 +1,175 @@
+"""AcquisitionService against local fake ESP32 servers (fake_esp32.py format)."""
+import asyncio
+import threading
+import time
+
+import pytest
+
+import fake_esp32
+from acquisition_service import AcquisitionService
+
+
+class ServerThread:
+    """Runs asyncio TCP servers on their own loop so the service under test can connect to them."""
+
+    def __init__(self):
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self.loop.run_forever, daemon=True)
+        self.thread.start()
+        self.servers = []
+
+    def call(self, coro):
+        return asyncio.run_coroutine_threadsafe(coro, self.loop).result(5)
+
+    def fake_devices(self, count, base=350.0, interval=0.05):
+        servers = self.call(fake_esp32.serve([0] * count, base=base, noise=0.5, interval=interval))
+        self.servers.extend(servers)
+        return [s.sockets[0].getsockname()[1] for s in servers]
+
+    def scripted(self, lines, interval=0.02, close=False, delay=0.0):
+        """Device that waits `delay`, sends `lines` (raw bytes, chunked oddly), then idles or closes."""
+        async def handle(reader, writer):
+            await asyncio.sleep(delay)
+            for chunk in lines:
+                writer.write(chunk)
+                await writer.drain()
+                await asyncio.sleep(interval)
+            if not close:
+                await asyncio.sleep(30)
+            writer.close()
+
+        server = self.call(asyncio.start_server(handle, "127.0.0.1", 0))
+        self.servers.append(server)
+        return server.sockets[0].getsockname()[1]
+
+    async def _shutdown(self):
+        for server in self.servers:
+            server.close()
+        # Connection handlers still streaming
+        tasks = [t for t in asyncio.all_tasks() if t is not asyncio.current_task()]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    def close(self):
+        self.call(self._shutdown())
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join(2)
+        self.loop.close()
+
+
+@pytest.fixture
+def servers():
+    s = ServerThread()
+    yield s
+    s.close()
+
+
+@pytest.fixture
+def service():
+    svc = AcquisitionService(reconnect_delay=0.05, max_reconnect_delay=0.2)
+    svc.start()
+    yield svc
+    svc.stop()
+
+
+def wait_for(predicate, timeout=5.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.02)
+    return False
+
+
+def test_reads_several_devices_concurrently(servers, service):
+    ports = servers.fake_devices(3)
+    for i, port in enumerate(ports):
+        service.add_device(f"Línea {i + 1}", "127.0.0.1", port)
+
+    assert wait_for(lambda: all(len(service.readings(name)) >= 5 for name in service.devices))
+    for i, name in enumerate(sorted(service.devices)):
+        values = [v for _, v in service.readings(name)]
+        # fake_esp32 offsets each port's base by its index
+        assert all(abs(v - (350.0 + i)) <= 0.5 for v in values)
+        assert service.status()[name]["connected"]
+
+
+def test_lines_split_across_packets(servers, service):
+    port = servers.scripted([b"25.", b"50\r", b"\n26.2", b"5\r\n", b"garbage\r\n27\r\n"])
+    service.add_device("A", "127.0.0.1", port)
+
+    assert wait_for(lambda: len(service.readings("A")) == 3)
+    assert [v for _, v in service.readings("A")] == [25.5, 26.25, 27.0]
+
+
+def test_measure_collects_a_run(servers, service):
+    port = servers.fake_devices(1)[0]
+    service.add_device("A", "127.0.0.1", port)
+    assert service.wait_connected("A", 5)
+
+    progress = []
+    run = service.measure("A", lambda accepted, elapsed: progress.append(accepted), max_duration=1.0, poll_interval=0.1)
+
+    assert run.stats.count >= 5
+    assert abs(run.average - 350.0) <= 0.5
+    assert sum(progress) == run.stats.count
+    summary = run.summary()
+    assert summary["samples_count"] == run.stats.count
+    assert summary["rejected_count"] == 0
+
+
+def test_measure_flags_faults_and_spikes(servers, service):
+    lines = [b"350.0\r\n", b"350.2\r\n", b"350.1\r\n", b"349.9\r\n", b"350.0\r\n",
+             b"900\r\n", b"350.1\r\n", b"nan\r\n", b"350.0\r\n"]
+    # The stream starts a little after connecting, once the run is listening
+    service.add_device("A", "127.0.0.1", servers.scripted(lines, interval=0.05, delay=0.3))
+    assert service.wait_connected("A", 5)
+
+    run = service.measure("A", lambda accepted, elapsed: None, max_duration=1.0, poll_interval=0.1)
+
+    samples = run.samples()
+    assert len(samples) == len(lines)
+    assert [bool(rejected) for _, _, rejected in samples] == [False] * 5 + [True, False, True, False]
+    assert run.summary()["fault_count"] == 2
+    assert abs(run.average - 350.04) < 0.01
+
+
+def test_fresh_window_starts_on_first_new_reading(servers, service):
+    lines = [f"{350 + i * 0.01:.2f}\r\n".encode() for i in range(40)]
+    # Connection 1 (drain run) and connection 2 (fresh run) both stay silent for 0.6s first
+    port = servers.scripted(lines, interval=0.02, close=True, delay=0.6)
+    service.add_device("A", "127.0.0.1", port)
+
+    assert service.wait_connected("A", 5)
+    drained = service.measure("A", lambda accepted, elapsed: None, max_duration=0.4, poll_interval=0.1, mode="drain")
+    # The drain window ran out before the device spoke
+    assert not drained.valid
+
+    assert wait_for(lambda: not service.devices["A"].connected)
+    assert service.wait_connected("A", 5)
+    fresh = service.measure("A", lambda accepted, elapsed: None, max_duration=0.4, poll_interval=0.1, mode="fresh")
+    assert fresh.stats.count >= 5
+    assert fresh.values[0] == 350.0
+
+
+def test_run_with_only_faults_is_invalid(servers, service):
+    lines = [b"nan\r\n", b"900\r\n", b"-50\r\n", b"nan\r\n"]
+    service.add_device("A", "127.0.0.1", servers.scripted(lines, interval=0.05, delay=0.3))
+    assert service.wait_connected("A", 5)
+
+    run = service.measure("A", lambda accepted, elapsed: None, max_duration=1.0, poll_interval=0.1)
+
+    assert len(run.samples()) == len(lines)
+    assert not run.valid
+    assert run.average is None
+    assert run.summary()["fault_count"] == len(lines)
+
+
+def test_reconnects_after_device_closes(servers, service):
+    port = servers.scripted([b"1.0\r\n", b"2.0\r\n"], close=True)
+    service.add_device("A", "127.0.0.1", port)
+
+    # Each connection delivers two readings, so more than two means it came back
+    assert wait_for(lambda: service.devices["A"].total_readings > 2)
+    assert service.status()["A"]["error"] in (None, "closed by device")
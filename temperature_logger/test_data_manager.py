@@ -0,0 +1,75 @@
+"""DataManager reads on a throwaway database."""
+import sqlite3
+import threading
+
+import pytest
+
+from data_manager import DataManager
+
+
+@pytest.fixture
+def db(tmp_path):
+    return DataManager(db_name=str(tmp_path / "logs.db"))
+
+
+def add_rows(db, count, line="Línea 1"):
+    return db.add_measurements_bulk([(line, f"S{i}", f"H{i}", 350.0 + i) for i in range(count)])
+
+
+def test_paging_down_and_back_up(db):
+    ids = add_rows(db, 12)
+    newest_first = ids[::-1]
+
+    first, cursor = db.get_measurements_page(None, None, 5)
+    second, cursor = db.get_measurements_page(None, cursor, 5)
+    assert [r[0] for r in first + second] == newest_first[:10]
+
+    # Back up from the top of the second page: the first page again, newest first
+    rows, more = db.get_measurements_newer_page(None, second[0][0], 5)
+    assert [r[0] for r in rows] == newest_first[:5]
+    assert not more
+
+    rows, more = db.get_measurements_newer_page(None, newest_first[-1], 5)
+    assert [r[0] for r in rows] == newest_first[6:11]
+    assert more
+
+
+def test_newer_page_applies_filters(db):
+    add_rows(db, 4, line="Línea 1")
+    other = add_rows(db, 4, line="Línea 2")
+
+    rows, more = db.get_measurements_newer_page({"line": "Línea 2"}, other[0], 10)
+    assert [r[0] for r in rows] == other[:0:-1]
+    assert not more
+
+
+def test_reads_from_many_threads_share_a_bounded_pool(tmp_path):
+    db = DataManager(db_name=str(tmp_path / "logs.db"), read_pool_size=3, cache_size=0)
+    ids = add_rows(db, 30)
+    errors = []
+
+    def reader(n):
+        try:
+            for i in range(20):
+                rows, _ = db.get_measurements_page({"code_source": f"S{(n + i) % 30}"}, None, 10)
+                assert [r[0] for r in rows] == [ids[(n + i) % 30]]
+                db.get_unique_codes()
+                db.get_downsampled_series(max_points=10)
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=reader, args=(n,)) for n in range(12)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert not errors
+    assert 1 <= len(db._read_conns) <= 3
+
+    db.close()
+    for conn in db._read_conns:
+        with pytest.raises(sqlite3.ProgrammingError):
+            conn.execute("SELECT 1")
+    # Still usable after close, without pooling
+    assert len(db.get_measurements_page(None, None, 5)[0]) == 5
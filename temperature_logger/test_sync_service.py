@@ -0,0 +1,121 @@
+"""SyncEngine against FakeBackend, on a throwaway local database."""
+import pytest
+
+from data_manager import DataManager
+from sync_service import FakeBackend, RemoteBackend, SyncEngine
+
+
+class FlakyBackend(FakeBackend):
+    """Applies part of a batch remotely, then fails, like a connection dropped mid-request."""
+
+    def __init__(self, fail_after):
+        super().__init__()
+        self.fail_after = fail_after
+
+    def push(self, rows):
+        if self.fail_after is not None:
+            applied, self.fail_after = self.fail_after, None
+            super().push(rows[:applied])
+            raise ConnectionError("connection reset")
+        super().push(rows)
+
+
+@pytest.fixture
+def db(tmp_path):
+    return DataManager(db_name=str(tmp_path / "sync.db"))
+
+
+def add_rows(db, count):
+    records = [("Línea 1", f"S{i}", f"H{i}", 350.0 + i, None, f"2026-01-02 03:04:{i:02d}") for i in range(count)]
+    return db.add_measurements_bulk(records)
+
+
+def local_rows(db):
+    return {row["id"]: row for row in db.get_measurements_after(0, 1000)}
+
+
+def test_remote_backend_is_abstract():
+    with pytest.raises(TypeError):
+        RemoteBackend()
+
+
+def test_pushes_full_rows(db):
+    add_rows(db, 3)
+    stats = {"samples_count": 12, "std_dev": 0.2, "min_temp": 349.8, "max_temp": 350.3,
+             "slope": 0.0, "duration": 8.4, "stable": 1, "rejected_count": 1}
+    db.add_measurement("Línea 2", "S9", "H9", 350.1, stats=stats)
+    backend = FakeBackend()
+
+    assert SyncEngine(db, backend).sync_once() == 4
+    # Same ids, original timestamps and run statistics on the remote side
+    assert backend.rows == local_rows(db)
+    assert backend.rows[1]["timestamp"] == "2026-01-02 03:04:00"
+    assert backend.rows[4]["samples_count"] == 12
+
+
+def test_retry_after_partial_failure_does_not_duplicate(db):
+    add_rows(db, 10)
+    backend = FlakyBackend(fail_after=4)
+    engine = SyncEngine(db, backend, batch_size=10)
+
+    with pytest.raises(ConnectionError):
+        engine.sync_once()
+    assert engine.cursor == 0
+    assert len(backend.rows) == 4
+
+    assert engine.sync_once() == 10
+    assert backend.rows == local_rows(db)
+    assert engine.pending() == 0
+
+
+def test_resumes_from_persisted_cursor(db):
+    add_rows(db, 5)
+    backend = FakeBackend()
+    SyncEngine(db, backend, batch_size=2).sync_once()
+    add_rows(db, 3)
+
+    # A new engine (e.g. after a restart) only sends what is after the mark
+    engine = SyncEngine(db, backend, batch_size=2)
+    assert engine.pending() == 2
+    assert engine.sync_once() == 3
+    assert backend.rows == local_rows(db)
+
+
+def test_deletes_are_synced(db):
+    ids = add_rows(db, 4)
+    backend = FakeBackend()
+    engine = SyncEngine(db, backend)
+    engine.sync_once()
+
+    db.delete_measurement(ids[1])
+    db.delete_measurement(ids[3])
+    assert engine.pending() == 2
+    assert engine.sync_once() == 2
+    assert sorted(backend.rows) == [ids[0], ids[2]]
+    assert engine.sync_once() == 0
+
+
+def test_row_deleted_before_sync_never_reaches_remote(db):
+    ids = add_rows(db, 3)
+    db.delete_measurement(ids[0])
+    backend = FakeBackend()
+
+    SyncEngine(db, backend).sync_once()
+    assert sorted(backend.rows) == ids[1:]
+
+
+def test_random_failures_converge(db):
+    add_rows(db, 50)
+    for rid in (3, 17, 42):
+        db.delete_measurement(rid)
+    backend = FakeBackend(failure_rate=0.5)
+    engine = SyncEngine(db, backend, batch_size=7)
+
+    for _ in range(200):
+        try:
+            engine.sync_once()
+            break
+        except ConnectionError:
+            pass
+    assert engine.pending() == 0
+    assert backend.rows == local_rows(db)
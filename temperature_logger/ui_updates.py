@@ -0,0 +1,37 @@
+import threading
+import time
+
+
+class CoalescedUpdater:
+    """Batches control changes and pushes them to the Flet page at most `max_fps` times per second.
+
+    `set` only marks a control dirty when a property actually changes, and
+    `flush` sends just the dirty controls (`page.update(*controls)`) instead of
+    diffing the whole page. Safe to call from acquisition threads.
+    """
+
+    def __init__(self, page, max_fps=10):
+        self.page = page
+        self.min_interval = 1.0 / max_fps
+        self.last_flush = 0.0
+        self.dirty = []
+        self.lock = threading.Lock()
+
+    def set(self, control, **props):
+        with self.lock:
+            for name, value in props.items():
+                if getattr(control, name) != value:
+                    setattr(control, name, value)
+                    if control not in self.dirty:
+                        self.dirty.append(control)
+
+    def flush(self, force=False):
+        with self.lock:
+            now = time.monotonic()
+            if not self.dirty or (not force and now - self.last_flush < self.min_interval):
+                return False
+            controls = self.dirty
+            self.dirty = []
+            self.last_flush = now
+        self.page.update(*controls)
+        return True
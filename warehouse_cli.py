@@ -0,0 +1,99 @@
+"""Línea de comandos del motor del almacén (sin Streamlit).
+
+Importa escaneos en lote a scans.db con las mismas reglas de asignación que
+la app:
+
+    python warehouse_cli.py import --packing packing.xlsx --shipments embarques.csv \
+        --layout layout.svg escaneos.csv
+
+- embarques.csv: la hoja de embarques exportada como CSV o XLSX (con sus filas de título)
+- escaneos.csv: filas camion,first_serial,last_serial (con o sin encabezado);
+  con --truck basta first_serial,last_serial
+"""
+import argparse
+import csv
+import sys
+from collections import Counter
+
+from shipment_sources import LocalFileSource
+from warehouse_engine import WarehouseEngine
+
+
+def read_rows(path):
+    with open(path, newline='', encoding='utf-8-sig') as f:
+        return [row for row in csv.reader(f) if any(cell.strip() for cell in row)]
+
+
+def build_engine(args):
+    engine = WarehouseEngine(db_path=args.db)
+    shipment_df, _ = LocalFileSource(args.shipments).load()
+    engine.set_shipments(shipment_df)
+    engine.load_packing(args.packing)
+    if args.layout:
+        with open(args.layout, encoding='utf-8') as f:
+            content = f.read()
+        if args.layout.lower().endswith(('.svg', '.xml')):
+            engine.load_layout_svg(content)
+        else:
+            engine.load_layout_text(content)
+    engine.init_db()
+    return engine
+
+
+def parse_scans(rows, truck=None):
+    """(camion, first_serial, last_serial) por fila; omite el encabezado si lo hay."""
+    if rows and 'serial' in ','.join(rows[0]).lower():
+        rows = rows[1:]
+    scans = []
+    for row in rows:
+        cells = [cell.strip() for cell in row]
+        if truck is not None:
+            scans.append((truck, cells[0], cells[1]))
+        else:
+            scans.append((cells[0], cells[1], cells[2]))
+    return scans
+
+
+def cmd_import(args):
+    engine = build_engine(args)
+    # Un lote (una transacción) por camión, en el orden del archivo
+    by_truck = {}
+    for truck, first_serial, last_serial in parse_scans(read_rows(args.scans), args.truck):
+        by_truck.setdefault(truck, []).append((first_serial, last_serial))
+
+    counts = Counter()
+    for truck, pairs in by_truck.items():
+        summary = engine.scan_batch(truck, pairs)
+        for status in ('accepted', 'duplicate', 'unmatched'):
+            counts[status] += len(summary[status])
+            if args.verbose:
+                for entry in summary[status]:
+                    print(f"{truck}\t{entry['first_serial']}\t{entry['last_serial']}\t{status}\t{entry.get('ubicacion') or ''}")
+    engine.flush()
+
+    print(f"Registrados: {counts['accepted']}  Duplicados: {counts['duplicate']}  Sin coincidencia: {counts['unmatched']}")
+    for item in engine.completed_trucks():
+        print(f"Camión {item['camion']} completo ({item['pallets_escaneados']}/{item['total_pallets']})")
+    return 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Motor del almacén sin interfaz")
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    imp = sub.add_parser('import', help="Importar escaneos en lote desde CSV")
+    imp.add_argument('scans', help="CSV con camion,first_serial,last_serial")
+    imp.add_argument('--packing', required=True, help="Packing list (Excel, hoja 'All number')")
+    imp.add_argument('--shipments', required=True, help="Hoja de embarques exportada a CSV o XLSX")
+    imp.add_argument('--layout', help="Layout SVG/XML o texto con ubicaciones CX-Y")
+    imp.add_argument('--truck', help="Camión para todas las filas (CSV con solo seriales)")
+    imp.add_argument('--db', default='scans.db')
+    imp.add_argument('-v', '--verbose', action='store_true')
+    imp.set_defaults(func=cmd_import)
+
+    args = parser.parse_args(argv)
+    return args.func(args)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,1306 @@
+"""Motor del almacén sin interfaz: datos, índices y reglas de escaneo/asignación/entrega.
+
+pt.py (Streamlit) solo renderiza a partir de un WarehouseEngine guardado en
+session_state, así que el estado costoso sobrevive a los reruns. El mismo
+motor se puede importar desde scripts, benchmarks o el CLI (warehouse_cli.py).
+"""
+import contextvars
+import json
+import re
+import sqlite3
+import threading
+import xml.etree.ElementTree as ET
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+import pandas as pd
+
+from instrumentation import tracer
+
+TARGET_HEADERS = ['CAMION', 'PALLET INICIAL', 'PALLET FINAL', 'LISTO PARA ENTREGA']
+LOCATION_RE = re.compile(r'^C\d+-\d+$')
+SLOTS_PER_LOCATION = 2
+SOURCE_COLUMN = 'ORIGEN'
+# Eventos del log de escaneos y cada cuántos se guarda un snapshot de los índices
+EVENT_TYPES = ('scanned', 'relocated', 'delivered', 'cleared')
+SNAPSHOT_EVERY = 500
+SNAPSHOTS_KEPT = 2
+
+
+# ==== FUNCIONES PURAS ====
+
+def find_header_row(all_values):
+    """Índice de la fila de encabezados: la primera de las 10 iniciales con al menos dos de TARGET_HEADERS."""
+    for i, row in enumerate(all_values[:10]):
+        row_upper = [str(cell).upper().strip() for cell in row]
+        found_headers = sum(1 for target in TARGET_HEADERS if any(target in cell for cell in row_upper))
+        if found_headers >= 2:
+            return i
+    return 0
+
+
+def parse_shipment_values(all_values):
+    """Convierte los valores crudos de la hoja de embarques en un DataFrame. Regresa (shipment_df, header_row_index)."""
+    # Buscar encabezados
+    header_row_index = find_header_row(all_values)
+
+    # Crear DataFrame con headers únicos
+    headers = []
+    header_count = {}
+    for i, cell in enumerate(all_values[header_row_index]):
+        header_str = str(cell).strip()
+        if not header_str:
+            header_str = f"Columna_{i+1}"
+
+        if header_str in header_count:
+            header_count[header_str] += 1
+            header_str = f"{header_str}_{header_count[header_str]}"
+        else:
+            header_count[header_str] = 1
+
+        headers.append(header_str)
+
+    data = all_values[header_row_index + 1:]
+    shipment_df = pd.DataFrame(data, columns=headers)
+
+    # Mapear columnas
+    column_mapping = {}
+    for req_col in TARGET_HEADERS:
+        for actual_col in shipment_df.columns:
+            if req_col in actual_col.upper():
+                column_mapping[req_col] = actual_col
+                break
+
+    for req_col, actual_col in column_mapping.items():
+        if actual_col in shipment_df.columns:
+            col_data = shipment_df[actual_col]
+
+            if isinstance(col_data, pd.DataFrame):
+                shipment_df[req_col] = col_data.iloc[:, 0]
+            else:
+                shipment_df[req_col] = col_data
+
+    shipment_df = shipment_df[list(column_mapping.keys())].copy()
+
+    for col in shipment_df.columns:
+        shipment_df[col] = shipment_df[col].astype(str).str.strip()
+
+    shipment_df = shipment_df[shipment_df['CAMION'] != ''].reset_index(drop=True)
+    return shipment_df, header_row_index
+
+
+def load_shipment_sheets(fetch, sheet_ids, max_workers=4, timeout=30.0):
+    """Carga varias hojas de embarques en paralelo y las une en un solo DataFrame.
+
+    `fetch(sheet_id)` regresa (all_values, handle). Cada hoja corre en un pool
+    acotado con su propio límite de `timeout` segundos desde que empieza; la
+    columna ORIGEN dice de qué hoja viene cada camión. Regresa
+    (shipment_df, sources) con sources[sheet_id] = {'handle', 'header_row',
+    'rows', 'load_time', 'error'}.
+    """
+    sheet_ids = list(dict.fromkeys(sheet_ids))
+    sources = {}
+    frames = []
+    if not sheet_ids:
+        return pd.DataFrame(columns=TARGET_HEADERS + [SOURCE_COLUMN]), sources
+
+    started = {}
+
+    def task(sheet_id):
+        started[sheet_id] = time.monotonic()
+        all_values, handle = fetch(sheet_id)
+        shipment_df, header_row = parse_shipment_values(all_values)
+        return shipment_df, header_row, handle, time.monotonic() - started[sheet_id]
+
+    pool = ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(sheet_ids))), thread_name_prefix="sheets")
+    # Cada hilo corre en una copia del contexto para medir en el Tracer de la sesión que llamó
+    futures = {pool.submit(contextvars.copy_context().run, task, sheet_id): sheet_id for sheet_id in sheet_ids}
+    pending = set(futures)
+    try:
+        while pending:
+            now = time.monotonic()
+            deadlines = [started[futures[f]] + timeout for f in pending if futures[f] in started]
+            wait_for = max(0.0, min(deadlines) - now) if deadlines else timeout
+            done, pending = wait(pending, timeout=wait_for, return_when=FIRST_COMPLETED)
+            for future in done:
+                sheet_id = futures[future]
+                try:
+                    shipment_df, header_row, handle, load_time = future.result()
+                except Exception as e:
+                    sources[sheet_id] = {'handle': None, 'header_row': None, 'rows': 0, 'load_time': None, 'error': str(e)}
+                    continue
+                shipment_df[SOURCE_COLUMN] = sheet_id
+                frames.append((sheet_ids.index(sheet_id), shipment_df))
+                sources[sheet_id] = {'handle': handle, 'header_row': header_row, 'rows': len(shipment_df), 'load_time': load_time, 'error': None}
+
+            now = time.monotonic()
+            for future in list(pending):
+                sheet_id = futures[future]
+                if sheet_id in started and now - started[sheet_id] >= timeout:
+                    pending.discard(future)
+                    sources[sheet_id] = {'handle': None, 'header_row': None, 'rows': 0, 'load_time': None,
+                                         'error': f"Tiempo agotado ({timeout:.0f}s)"}
+    finally:
+        # Las hojas vencidas siguen su hilo en segundo plano; no se esperan
+        pool.shutdown(wait=False, cancel_futures=True)
+
+    if not frames:
+        return pd.DataFrame(columns=TARGET_HEADERS + [SOURCE_COLUMN]), sources
+    # Orden estable: el de las hojas pedidas, no el de llegada
+    frames.sort(key=lambda item: item[0])
+    return pd.concat([frame for _, frame in frames], ignore_index=True), sources
+
+
+@tracer.timed("excel.load_packing")
+def load_packing_data(packing_file):
+    """Lee el packing list (hoja 'All number') y resume seriales y cajas por pallet."""
+    packing_df = pd.read_excel(packing_file, sheet_name='All number')
+
+    packing_df['Box number'] = packing_df['Box number'].ffill()
+    packing_df['Pallet number'] = packing_df['Pallet number'].ffill()
+    packing_df['Pallet number'] = packing_df['Pallet number'].astype(str).str.strip()
+
+    pallet_summary = packing_df.groupby('Pallet number').agg({
+        'Serial number': ['first', 'last'],
+        'Box number': 'count'
+    }).reset_index()
+
+    pallet_summary.columns = ['Pallet number', 'first_serial', 'last_serial', 'box_count']
+
+    return packing_df, pallet_summary
+
+
+def extraer_numero_pallet(codigo):
+    """Extrae el número de pallet del código escaneado"""
+    try:
+        # Buscar patrones comunes en códigos de pallet
+        # Ejemplo: "PALLET003", "PLT003", "003", "P003", etc.
+
+        # Intentar extraer números al final del código
+        match = re.search(r'(\d{2,3})$', codigo)
+        if match:
+            return int(match.group(1))
+
+        # Intentar extraer números después de "PALLET", "PLT", "P", etc.
+        match = re.search(r'(?:PALLET|PLT|P)[_-]?(\d{2,3})', codigo, re.IGNORECASE)
+        if match:
+            return int(match.group(1))
+
+        # Si no se encuentra patrón, usar los últimos 2-3 dígitos
+        if len(codigo) >= 2:
+            ultimos_digitos = codigo[-3:] if codigo[-3:].isdigit() else codigo[-2:]
+            if ultimos_digitos.isdigit():
+                return int(ultimos_digitos)
+
+        return None
+    except:
+        return None
+
+
+def calcular_ubicacion_pallet(numero_pallet, camion):
+    """Calcula la ubicación basada en el número de pallet y el camión"""
+    # Cada ubicación contiene 2 pallets
+    # Pallet 1 y 2 -> C1-1
+    # Pallet 3 y 4 -> C1-2
+    # Pallet 5 y 6 -> C1-3
+    # etc.
+    try:
+        numero_ubicacion = ((numero_pallet - 1) // 2) + 1
+        return f"{camion}-{numero_ubicacion}"
+    except Exception as e:
+        print(f"Error calculando ubicación: {e}")
+        return f"{camion}-1"
+
+
+@tracer.timed("svg.parse")
+def parse_svg_xml(xml_content):
+    """Parsea un archivo SVG/XML con el layout del almacén. Lanza ET.ParseError si el XML es inválido."""
+    root = ET.fromstring(xml_content)
+
+    locations = []
+    shapes_data = []
+
+    # Buscar todos los elementos que representen ubicaciones
+    namespace = '{http://www.w3.org/2000/svg}'
+
+    # Rectángulos
+    for rect in root.findall(f'.//{namespace}rect'):
+        ubicacion = rect.get('id') or rect.get('data-ubicacion')
+        if ubicacion and LOCATION_RE.match(ubicacion):
+            locations.append(ubicacion)
+            shapes_data.append({
+                'type': 'rect',
+                'ubicacion': ubicacion,
+                'x': float(rect.get('x', 0)),
+                'y': float(rect.get('y', 0)),
+                'width': float(rect.get('width', 0)),
+                'height': float(rect.get('height', 0)),
+                'fill': rect.get('fill', '#cccccc'),
+                'stroke': rect.get('stroke', '#000000')
+            })
+
+    # Polígonos
+    for polygon in root.findall(f'.//{namespace}polygon'):
+        ubicacion = polygon.get('id') or polygon.get('data-ubicacion')
+        if ubicacion and LOCATION_RE.match(ubicacion):
+            locations.append(ubicacion)
+            points = polygon.get('points', '').split()
+            shapes_data.append({
+                'type': 'polygon',
+                'ubicacion': ubicacion,
+                'points': points,
+                'fill': polygon.get('fill', '#cccccc'),
+                'stroke': polygon.get('stroke', '#000000')
+            })
+
+    # Textos (etiquetas)
+    for text in root.findall(f'.//{namespace}text'):
+        ubicacion = text.get('id') or text.get('data-ubicacion')
+        text_content = text.text
+        if ubicacion and LOCATION_RE.match(ubicacion):
+            locations.append(ubicacion)
+            shapes_data.append({
+                'type': 'text',
+                'ubicacion': ubicacion,
+                'x': float(text.get('x', 0)),
+                'y': float(text.get('y', 0)),
+                'content': text_content,
+                'fill': text.get('fill', '#000000')
+            })
+
+    return locations, shapes_data
+
+
+def parse_layout_text(layout_text):
+    """Layout por texto: ubicaciones CX-Y separadas por tabs, comas o espacios, dibujadas en una rejilla simple."""
+    locations = []
+    for line in layout_text.strip().split('\n'):
+        cells = re.split(r'\t|,|\s{2,}', line.strip())
+        for cell in cells:
+            cell = cell.strip()
+            if cell and LOCATION_RE.match(cell):
+                locations.append(cell)
+
+    shapes_data = []
+    for i, ubicacion in enumerate(locations):
+        shapes_data.append({
+            'type': 'rect',
+            'ubicacion': ubicacion,
+            'x': (i % 10) * 60,
+            'y': (i // 10) * 40,
+            'width': 50,
+            'height': 30,
+            'fill': '#cccccc',
+            'stroke': '#666666'
+        })
+    return locations, shapes_data
+
+
+def extract_sheet_id(url):
+    patterns = [r'/spreadsheets/d/([a-zA-Z0-9-_]+)', r'id=([a-zA-Z0-9-_]+)', r'/d/([a-zA-Z0-9-_]+)']
+    for pattern in patterns:
+        match = re.search(pattern, url)
+        if match:
+            return match.group(1)
+    return url if len(url) > 30 else None
+
+
+def parse_serial_pairs(text):
+    """Pares (first_serial, last_serial) de texto pegado o de un CSV.
+
+    Una pareja por línea, separada por tab, coma, punto y coma o espacios.
+    Omite líneas vacías y el encabezado. Regresa (pairs, invalid_lines).
+    """
+    pairs = []
+    invalid = []
+    for line in text.splitlines():
+        if not line.strip():
+            continue
+        cells = [cell.strip().strip('"') for cell in re.split(r'[\t,;]|\s+', line.strip())]
+        cells = [cell for cell in cells if cell]
+        if len(cells) < 2:
+            invalid.append(line)
+        elif not pairs and not invalid and 'serial' in line.lower():
+            continue
+        else:
+            pairs.append((cells[0], cells[1]))
+    return pairs, invalid
+
+
+def select_truck_pallets(truck_data, pallet_summary):
+    """Pallets del resumen dentro del rango PALLET INICIAL..PALLET FINAL del camión."""
+    pallet_start = str(truck_data['PALLET INICIAL']).strip()
+    pallet_end = str(truck_data['PALLET FINAL']).strip()
+
+    # Crear una lista para almacenar los pallets que coinciden
+    matching_pallets = []
+
+    for _, pallet_row in pallet_summary.iterrows():
+        pallet_num = str(pallet_row['Pallet number'])
+
+        # Intentar comparar como números si es posible
+        try:
+            pallet_num_float = float(pallet_num)
+            start_float = float(pallet_start)
+            end_float = float(pallet_end)
+
+            if start_float <= pallet_num_float <= end_float:
+                matching_pallets.append(pallet_row)
+        except (ValueError, TypeError):
+            # Si no se pueden convertir a números, comparar como strings
+            if pallet_start <= pallet_num <= pallet_end:
+                matching_pallets.append(pallet_row)
+
+    if matching_pallets:
+        return pd.DataFrame(matching_pallets)
+    return pd.DataFrame(columns=pallet_summary.columns)
+
+
+# ==== MOTOR ====
+
+def replay_snapshot_state(state, events):
+    """Aplica eventos del log (event, camion, pallet, ubicacion, slot) sobre un snapshot.
+
+    Mismas reglas que WarehouseEngine._apply_event, pero solo sobre lo que guarda
+    el snapshot: {'scans': [[camion, pallet, ubicacion, slot], ...], 'delivered': [...]}.
+    """
+    scans = set()
+    locations = {}
+    delivered = set()
+    if state:
+        for camion, pallet, ubicacion, slot in state['scans']:
+            scans.add((camion, pallet))
+            if ubicacion is not None:
+                locations[(camion, pallet)] = (ubicacion, slot or 1)
+        delivered.update(state['delivered'])
+
+    for event, camion, pallet, ubicacion, slot in events:
+        camion = str(camion) if camion is not None else None
+        key = (camion, str(pallet))
+        if event == 'scanned':
+            if key in scans:
+                continue
+            scans.add(key)
+            if ubicacion is not None:
+                locations[key] = (ubicacion, slot or 1)
+        elif event == 'relocated':
+            locations[key] = (ubicacion, slot or 1)
+        elif event == 'delivered':
+            scans = {scan for scan in scans if scan[0] != camion}
+            locations = {k: v for k, v in locations.items() if k[0] != camion}
+            delivered.add(camion)
+        elif event == 'cleared':
+            scans, locations, delivered = set(), {}, set()
+
+    return {
+        'scans': [[camion, pallet, *locations.get((camion, pallet), (None, None))] for camion, pallet in sorted(scans)],
+        'delivered': sorted(delivered),
+    }
+
+
+class WarehouseEngine:
+    """Dueño de los datos del almacén y de sus índices.
+
+    - shipment_df / pallet_summary: hoja de embarques y packing list
+    - layout_locations / layout_shapes / camiones_layout: layout cargado
+    - pallet_assignments: ubicación -> [{'camion', 'pallet', 'slot'}, ...] (máximo 2)
+    - scans_db: {(camion, pallet)} ya escaneados, espejo de la tabla pallet_scans
+
+    Cada cambio se guarda como evento en `scan_events` (log de solo agregar:
+    scanned, relocated, delivered, cleared) junto con la tabla de estado
+    `pallet_scans`, en la misma transacción. Cada SNAPSHOT_EVERY eventos se
+    guarda un snapshot del estado, armado desde el log (incluye los eventos de
+    otras sesiones); al iniciar se carga el último y solo se reproducen los
+    eventos posteriores.
+
+    Las escrituras a SQLite van en un hilo escritor único (en orden); `flush()` espera a que terminen.
+    """
+
+    def __init__(self, db_path='scans.db', status_updater=None):
+        self.db_path = db_path
+        # Callback(truck, status) para reflejar el estatus en la hoja de Google
+        self.status_updater = status_updater
+
+        self.shipment_df = pd.DataFrame(columns=TARGET_HEADERS)
+        self.packing_df = None
+        self.pallet_summary = None
+
+        self.layout_locations = []
+        self.layout_shapes = []
+        self.layout_type = None
+        self.camiones_layout = []
+        self._location_set = set()
+        self.layout_version = 0       # cambia con cada layout cargado (el mapa del navegador lo usa para saber si recargar)
+
+        self.pallet_assignments = {}
+        self.scans_db = set()
+        self.delivered_trucks = set()
+        self._pallet_locations = {}   # (camion, pallet) -> (ubicacion, slot)
+        self._truck_pallets_cache = {}
+        self._serial_index = {}       # camion -> {(first_serial, last_serial): fila}
+
+        self._lock = threading.RLock()
+        self._writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="scans-db")
+        self._pending_writes = []
+        self._pending_first = {}      # camion -> primer serial esperando su pareja (modo continuo)
+        self._events_since_snapshot = 0
+
+    # --- Carga de datos ---
+    def set_shipments(self, shipment_df):
+        with self._lock:
+            self.shipment_df = shipment_df
+            self._truck_pallets_cache.clear()
+            self._serial_index.clear()
+
+    def set_packing(self, packing_df, pallet_summary):
+        with self._lock:
+            self.packing_df = packing_df
+            self.pallet_summary = pallet_summary
+            self._truck_pallets_cache.clear()
+            self._serial_index.clear()
+
+    def load_packing(self, packing_file):
+        self.set_packing(*load_packing_data(packing_file))
+
+    def set_layout(self, locations, shapes_data, layout_type):
+        with self._lock:
+            self.layout_locations = locations
+            self.layout_shapes = shapes_data
+            self.layout_type = layout_type
+            self._location_set = set(locations)
+            self.camiones_layout = self.detect_layout_trucks()
+            self.layout_version += 1
+
+    def load_layout_svg(self, xml_content):
+        self.set_layout(*parse_svg_xml(xml_content), "svg")
+
+    def load_layout_text(self, layout_text):
+        self.set_layout(*parse_layout_text(layout_text), "text")
+
+    # --- Base de datos ---
+    def _connect(self):
+        return sqlite3.connect(self.db_path, check_same_thread=False)
+
+    @tracer.timed("sqlite.load_scans")
+    def init_db(self):
+        """Crea las tablas y reconstruye el estado: último snapshot + eventos posteriores."""
+        conn = self._connect()
+        with conn:
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS pallet_scans (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    camion TEXT,
+                    pallet_number TEXT,
+                    first_serial TEXT,
+                    last_serial TEXT,
+                    ubicacion TEXT,
+                    slot INTEGER DEFAULT 1,
+                    scanned_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    UNIQUE(camion, pallet_number)
+                )
+            ''')
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS scan_events (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    event TEXT NOT NULL,
+                    camion TEXT,
+                    pallet_number TEXT,
+                    first_serial TEXT,
+                    last_serial TEXT,
+                    ubicacion TEXT,
+                    slot INTEGER,
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                )
+            ''')
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS scan_snapshots (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    last_event_id INTEGER NOT NULL,
+                    state TEXT NOT NULL,
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                )
+            ''')
+            # Bases anteriores al log: el estado actual entra como eventos 'scanned'
+            if conn.execute('SELECT 1 FROM scan_events LIMIT 1').fetchone() is None:
+                conn.execute('''
+                    INSERT INTO scan_events (event, camion, pallet_number, first_serial, last_serial, ubicacion, slot, created_at)
+                    SELECT 'scanned', camion, pallet_number, first_serial, last_serial, ubicacion, slot, scanned_at
+                    FROM pallet_scans ORDER BY id
+                ''')
+
+        snapshot = conn.execute('SELECT last_event_id, state FROM scan_snapshots ORDER BY id DESC LIMIT 1').fetchone()
+        last_event_id = snapshot[0] if snapshot else 0
+        events = conn.execute(
+            'SELECT event, camion, pallet_number, ubicacion, slot FROM scan_events WHERE id > ? ORDER BY id',
+            (last_event_id,)
+        ).fetchall()
+        conn.close()
+
+        with self._lock:
+            self._reset_state()
+            if snapshot:
+                state = json.loads(snapshot[1])
+                for camion, pallet, ubicacion, slot in state['scans']:
+                    self._apply_event('scanned', camion, pallet, ubicacion, slot)
+                self.delivered_trucks = set(state['delivered'])
+            for event, camion, pallet, ubicacion, slot in events:
+                self._apply_event(event, camion, pallet, ubicacion, slot)
+            self._events_since_snapshot = len(events)
+        return len(events)
+
+    def _reset_state(self):
+        self.scans_db = set()
+        self.pallet_assignments = {}
+        self._pallet_locations = {}
+        self.delivered_trucks = set()
+
+    def _apply_event(self, event, camion, pallet, ubicacion=None, slot=None):
+        """Aplica un evento del log a los índices en memoria (reproducción al iniciar)."""
+        camion = str(camion) if camion is not None else None
+        if event == 'scanned':
+            if (camion, str(pallet)) in self.scans_db:
+                return
+            self.scans_db.add((camion, str(pallet)))
+            if ubicacion is not None:
+                self._add_assignment(ubicacion, {'camion': camion, 'pallet': str(pallet), 'slot': slot or 1})
+        elif event == 'relocated':
+            self._remove_assignment(camion, str(pallet))
+            self._add_assignment(ubicacion, {'camion': camion, 'pallet': str(pallet), 'slot': slot or 1})
+        elif event == 'delivered':
+            self._release_truck(camion)
+            self.delivered_trucks.add(camion)
+        elif event == 'cleared':
+            self._reset_state()
+
+    def _log_events(self, events):
+        """Encola eventos (event, camion, pallet, first, last, ubicacion, slot): se agregan al log y
+        se aplican a pallet_scans en una sola transacción. Llamar con self._lock tomado, justo
+        después de cambiar el estado en memoria, para que el orden del log sea el mismo."""
+        @tracer.timed("sqlite.save_events")
+        def save_to_db():
+            conn = self._connect()
+            with conn:
+                conn.executemany(
+                    'INSERT INTO scan_events (event, camion, pallet_number, first_serial, last_serial, ubicacion, slot) VALUES (?, ?, ?, ?, ?, ?, ?)',
+                    events
+                )
+                for event, camion, pallet, first_serial, last_serial, ubicacion, slot in events:
+                    if event == 'scanned':
+                        conn.execute(
+                            'INSERT OR IGNORE INTO pallet_scans (camion, pallet_number, first_serial, last_serial, ubicacion, slot) VALUES (?, ?, ?, ?, ?, ?)',
+                            (camion, pallet, first_serial, last_serial, ubicacion, slot)
+                        )
+                    elif event == 'relocated':
+                        conn.execute('UPDATE pallet_scans SET ubicacion = ?, slot = ? WHERE camion = ? AND pallet_number = ?',
+                                     (ubicacion, slot, camion, pallet))
+                    elif event == 'delivered':
+                        conn.execute('DELETE FROM pallet_scans WHERE camion = ?', (camion,))
+                    elif event == 'cleared':
+                        conn.execute('DELETE FROM pallet_scans')
+            conn.close()
+
+        future = self._submit_write(save_to_db)
+        self._events_since_snapshot += len(events)
+        if self._events_since_snapshot >= SNAPSHOT_EVERY:
+            self._write_snapshot()
+        return future
+
+    def _write_snapshot(self):
+        """Snapshot construido desde la base en el hilo escritor: último snapshot + eventos posteriores.
+
+        No se usa el estado en memoria porque no incluye los eventos que otras
+        sesiones agregaron al log después de `init_db`; así `last_event_id` es
+        exactamente el último evento que contiene el snapshot.
+        """
+        @tracer.timed("sqlite.snapshot")
+        def save_snapshot():
+            conn = self._connect()
+            with conn:
+                # Bloqueo de escritura de SQLite: nadie agrega eventos entre la lectura y el snapshot
+                conn.execute('BEGIN IMMEDIATE')
+                previous = conn.execute('SELECT last_event_id, state FROM scan_snapshots ORDER BY id DESC LIMIT 1').fetchone()
+                last_event_id = previous[0] if previous else 0
+                events = conn.execute(
+                    'SELECT id, event, camion, pallet_number, ubicacion, slot FROM scan_events WHERE id > ? ORDER BY id',
+                    (last_event_id,)
+                ).fetchall()
+                if events:
+                    state = replay_snapshot_state(json.loads(previous[1]) if previous else None, [e[1:] for e in events])
+                    conn.execute(
+                        'INSERT INTO scan_snapshots (last_event_id, state) VALUES (?, ?)',
+                        (events[-1][0], json.dumps(state))
+                    )
+                    conn.execute(
+                        'DELETE FROM scan_snapshots WHERE id NOT IN (SELECT id FROM scan_snapshots ORDER BY id DESC LIMIT ?)',
+                        (SNAPSHOTS_KEPT,)
+                    )
+            conn.close()
+
+        self._events_since_snapshot = 0
+        return self._submit_write(save_snapshot)
+
+    def history(self, truck=None, limit=200):
+        """Últimos eventos del log (más recientes primero), opcionalmente de un camión."""
+        self.flush()
+        sql = 'SELECT id, event, camion, pallet_number, first_serial, last_serial, ubicacion, slot, created_at FROM scan_events'
+        params = []
+        if truck is not None:
+            sql += ' WHERE camion = ? OR event = ?'
+            params += [str(truck), 'cleared']
+        sql += ' ORDER BY id DESC LIMIT ?'
+        params.append(limit)
+        conn = self._connect()
+        rows = conn.execute(sql, params).fetchall()
+        conn.close()
+        columns = ['id', 'event', 'camion', 'pallet_number', 'first_serial', 'last_serial', 'ubicacion', 'slot', 'created_at']
+        return [dict(zip(columns, row)) for row in rows]
+
+    def _submit_write(self, fn):
+        # El escritor hereda el contexto (Tracer de la sesión) de quien encola
+        future = self._writer.submit(contextvars.copy_context().run, fn)
+        self._pending_writes = [f for f in self._pending_writes if not f.done()] + [future]
+        return future
+
+    def flush(self):
+        """Espera a que terminen las escrituras pendientes en SQLite."""
+        for future in list(self._pending_writes):
+            future.result()
+        self._pending_writes = []
+
+    # --- Consultas ---
+    def detect_layout_trucks(self):
+        """Detecta los camiones (C<n>) presentes en el layout"""
+        camiones = set()
+        for location in self.layout_locations:
+            match = re.match(r'C(\d+)-\d+', location)
+            if match:
+                camiones.add(int(match.group(1)))
+        return sorted(camiones)
+
+    def detect_available_truck(self, truck_packing_list):
+        """Detecta el primer camión disponible basado en el layout y los camiones ya usados"""
+        camiones_layout = self.camiones_layout
+        if not camiones_layout:
+            return None
+
+        # Si el camión del packing list ya está en el layout, usar ese mismo
+        if truck_packing_list and str(truck_packing_list).isdigit():
+            truck_num = int(truck_packing_list)
+            if truck_num in camiones_layout:
+                return f"C{truck_num}"
+
+        # Buscar el primer camión disponible en el layout que no esté usado
+        camiones_usados = {int(camion) for camion, _ in self.scans_db if camion and camion.isdigit()}
+        for camion in camiones_layout:
+            if camion not in camiones_usados:
+                return f"C{camion}"
+
+        # Si todos los camiones están usados, usar el primero del layout
+        return f"C{camiones_layout[0]}"
+
+    def truck_row(self, truck):
+        rows = self.shipment_df[self.shipment_df['CAMION'] == truck]
+        return rows.iloc[0] if len(rows) else None
+
+    @tracer.timed("engine.truck_pallets")
+    def truck_pallets(self, truck):
+        """Pallets del camión (en caché hasta que cambien embarques o packing list)."""
+        truck = str(truck)
+        with self._lock:
+            cached = self._truck_pallets_cache.get(truck)
+        if cached is not None:
+            return cached
+        truck_data = self.truck_row(truck)
+        if truck_data is None or self.pallet_summary is None:
+            result = pd.DataFrame()
+        else:
+            result = select_truck_pallets(truck_data, self.pallet_summary)
+        with self._lock:
+            self._truck_pallets_cache[truck] = result
+        return result
+
+    def is_scanned(self, truck, pallet):
+        return (str(truck), str(pallet)) in self.scans_db
+
+    def scanned_count(self, truck):
+        pallets = self.truck_pallets(truck)
+        if pallets.empty:
+            return 0
+        return sum(1 for p in pallets['Pallet number'] if self.is_scanned(truck, p))
+
+    def pallet_location(self, truck, pallet):
+        return self._pallet_locations.get((str(truck), str(pallet)), (None, None))
+
+    def _truck_serial_index(self, truck):
+        truck = str(truck)
+        with self._lock:
+            index = self._serial_index.get(truck)
+        if index is None:
+            index = {}
+            for _, pallet in self.truck_pallets(truck).iterrows():
+                index.setdefault((str(pallet['first_serial']), str(pallet['last_serial'])), pallet)
+            with self._lock:
+                self._serial_index[truck] = index
+        return index
+
+    def find_pallet(self, truck, first_serial, last_serial):
+        """Fila del pallet del camión cuyos seriales coinciden, o None."""
+        return self._truck_serial_index(truck).get((first_serial, last_serial))
+
+    def is_first_serial(self, truck, serial):
+        return any(first == serial for first, _ in self._truck_serial_index(truck))
+
+    def expected_location(self, pallet, camion_layout):
+        numero_pallet = extraer_numero_pallet(str(pallet))
+        if numero_pallet and camion_layout:
+            return calcular_ubicacion_pallet(numero_pallet, camion_layout)
+        return ""
+
+    def truck_locations(self, truck):
+        """Ubicaciones con al menos un pallet del camión"""
+        truck = str(truck)
+        return [
+            loc for loc, assignments in self.pallet_assignments.items()
+            if any(str(a.get('camion', '')) == truck for a in assignments)
+        ]
+
+    @tracer.timed("tab3.completed_trucks")
+    def completed_trucks(self):
+        """Camiones con todos sus pallets escaneados, con ubicaciones y aún no entregados."""
+        completed = []
+        for truck in self.shipment_df['CAMION'].unique():
+            if str(truck) in self.delivered_trucks:
+                continue
+            total = len(self.truck_pallets(truck))
+            scanned = self.scanned_count(truck)
+            if scanned >= total and total > 0 and self.truck_locations(truck):
+                completed.append({
+                    'camion': truck,
+                    'pallets_escaneados': scanned,
+                    'total_pallets': total
+                })
+        return completed
+
+    # --- Operaciones ---
+    def _add_assignment(self, ubicacion, assignment):
+        self.pallet_assignments.setdefault(ubicacion, []).append(assignment)
+        self._pallet_locations[(str(assignment['camion']), str(assignment['pallet']))] = (ubicacion, assignment.get('slot', 1))
+
+    def assign_location(self, truck_packing_list, pallet):
+        """Asigna ubicación al pallet en el camión del layout detectado. Regresa (ubicacion, slot) o (None, None)."""
+        if not self.layout_locations:
+            return None, None
+
+        # DETECTAR CAMIÓN DISPONIBLE AUTOMÁTICAMENTE
+        camion_actual = self.detect_available_truck(truck_packing_list)
+        if not camion_actual:
+            return None, None
+
+        numero_pallet = extraer_numero_pallet(str(pallet))
+        if numero_pallet is None:
+            return None, None
+
+        # CALCULAR UBICACIÓN BASADA EN NÚMERO DE PALLET Y CAMIÓN DETECTADO
+        ubicacion = calcular_ubicacion_pallet(numero_pallet, camion_actual)
+
+        # Verificar si la ubicación calculada existe en el layout
+        if ubicacion not in self._location_set:
+            # Buscar la ubicación más cercana disponible
+            ubicaciones_camion = [loc for loc in self.layout_locations if loc.startswith(f'{camion_actual}-')]
+            if not ubicaciones_camion:
+                return None, None
+
+            # Ordenar ubicaciones y tomar la primera disponible
+            ubicaciones_camion.sort(key=lambda x: int(x.split('-')[1]))
+            ubicacion = ubicaciones_camion[0]
+
+        with self._lock:
+            # Verificar si hay espacio (máximo 2 pallets por ubicación)
+            current_assignments = self.pallet_assignments.get(ubicacion, [])
+            if len(current_assignments) >= SLOTS_PER_LOCATION:
+                return None, None
+
+            # Encontrar slot disponible
+            used_slots = {assig.get('slot', 1) for assig in current_assignments}
+            available_slot = 1 if 1 not in used_slots else 2
+
+            self._add_assignment(ubicacion, {
+                'camion': str(truck_packing_list),  # Guardamos el camión del packing list
+                'pallet': str(pallet),
+                'slot': available_slot
+            })
+        return ubicacion, available_slot
+
+    def register_scan(self, truck, pallet, first_serial, last_serial):
+        """Asigna ubicación y guarda el escaneo (la escritura en SQLite va en segundo plano)."""
+        with self._lock:
+            ubicacion, slot = self.assign_location(truck, pallet)
+            self.scans_db.add((str(truck), str(pallet)))
+            self._log_events([('scanned', str(truck), str(pallet), str(first_serial), str(last_serial), ubicacion, slot)])
+        return ubicacion, slot
+
+    @tracer.timed("engine.scan_batch")
+    def scan_batch(self, truck, pairs):
+        """Registra en lote pares (first_serial, last_serial) del camión.
+
+        Valida todo contra el índice de seriales en una pasada, asigna
+        ubicaciones en memoria y guarda todas las filas en una transacción.
+        Regresa {'accepted': [...], 'duplicate': [...], 'unmatched': [...], 'completed': bool};
+        accepted/duplicate llevan dicts con first_serial, last_serial, pallet, ubicacion y slot.
+        """
+        summary = {'accepted': [], 'duplicate': [], 'unmatched': [], 'completed': False}
+        to_register = []
+        seen = set()
+        for first_serial, last_serial in pairs:
+            first_serial = str(first_serial).strip()
+            last_serial = str(last_serial).strip()
+            entry = {'first_serial': first_serial, 'last_serial': last_serial}
+            matching_pallet = self.find_pallet(truck, first_serial, last_serial)
+            if matching_pallet is None:
+                summary['unmatched'].append(entry)
+                continue
+            pallet_number = str(matching_pallet['Pallet number'])
+            entry['pallet'] = pallet_number
+            if pallet_number in seen or self.is_scanned(truck, pallet_number):
+                entry['ubicacion'], entry['slot'] = self.pallet_location(truck, pallet_number)
+                summary['duplicate'].append(entry)
+                continue
+            seen.add(pallet_number)
+            to_register.append(entry)
+
+        if to_register:
+            events = []
+            with self._lock:
+                for entry in to_register:
+                    entry['ubicacion'], entry['slot'] = self.assign_location(truck, entry['pallet'])
+                    self.scans_db.add((str(truck), entry['pallet']))
+                    events.append(('scanned', str(truck), entry['pallet'], entry['first_serial'], entry['last_serial'],
+                                   entry['ubicacion'], entry['slot']))
+                saved = self._log_events(events)
+            # Esperar la transacción: el resumen solo cuenta lo que quedó guardado
+            saved.result()
+            summary['accepted'] = to_register
+            summary['completed'] = self.scanned_count(truck) >= len(self.truck_pallets(truck))
+            if summary['completed'] and self.status_updater:
+                self.status_updater(truck, "Listo")
+        return summary
+
+    @tracer.timed("engine.scan")
+    def scan(self, truck, first_serial, last_serial):
+        """Procesa un escaneo (primer y último serial) del camión seleccionado.
+
+        Regresa un dict con 'status' en: 'registered', 'duplicate', 'unmatched',
+        más 'pallet', 'ubicacion', 'slot' y 'completed' según aplique.
+        """
+        first_serial = str(first_serial).strip()
+        last_serial = str(last_serial).strip()
+        matching_pallet = self.find_pallet(truck, first_serial, last_serial)
+        if matching_pallet is None:
+            return {'status': 'unmatched'}
+
+        pallet_number = matching_pallet['Pallet number']
+        if self.is_scanned(truck, pallet_number):
+            ubicacion, slot = self.pallet_location(truck, pallet_number)
+            return {'status': 'duplicate', 'pallet': pallet_number, 'ubicacion': ubicacion, 'slot': slot}
+
+        ubicacion, slot = self.register_scan(truck, pallet_number, first_serial, last_serial)
+        completed = self.scanned_count(truck) >= len(self.truck_pallets(truck))
+        if completed and self.status_updater:
+            self.status_updater(truck, "Listo")
+        return {
+            'status': 'registered',
+            'pallet': pallet_number,
+            'ubicacion': ubicacion,
+            'slot': slot,
+            'completed': completed,
+        }
+
+    def feed_serial(self, truck, serial):
+        """Modo continuo (lector tipo teclado): recibe seriales y los empareja.
+
+        El primer serial queda pendiente hasta que llega el último; entonces se
+        procesa como `scan()`, así un pallet repetido sale como 'duplicate' sin
+        ventana de tiempo. Si la pareja no coincide pero el nuevo serial es el
+        primero de otro pallet (se perdió una lectura), se toma como nuevo
+        pendiente. Un valor con varios seriales ("primero último primero
+        último ...") descarta el pendiente anterior y se procesa completo en
+        orden; si sobra uno, queda pendiente.
+        Regresa una lista con un resultado por serial: el de `scan()` con
+        first_serial/last_serial, o {'status': 'pending', 'first_serial': ...}.
+        """
+        truck = str(truck)
+        parts = [part for part in re.split(r'[\t,;]|\s+', str(serial).strip()) if part]
+        if len(parts) >= 2:
+            self.clear_pending(truck)
+        return [self._feed_one(truck, part, resync=len(parts) == 1) for part in parts]
+
+    def _feed_one(self, truck, serial, resync=True):
+        with self._lock:
+            first_serial = self._pending_first.pop(truck, None)
+            if first_serial is None:
+                self._pending_first[truck] = serial
+                return {'status': 'pending', 'first_serial': serial}
+        last_serial = serial
+
+        result = self.scan(truck, first_serial, last_serial)
+        result.update(first_serial=first_serial, last_serial=last_serial)
+        if result['status'] == 'unmatched' and resync and self.is_first_serial(truck, last_serial):
+            with self._lock:
+                self._pending_first[truck] = last_serial
+            result['resync'] = True
+        return result
+
+    def pending_serial(self, truck):
+        return self._pending_first.get(str(truck))
+
+    def clear_pending(self, truck):
+        with self._lock:
+            self._pending_first.pop(str(truck), None)
+
+    def _remove_assignment(self, camion, pallet):
+        ubicacion, _ = self._pallet_locations.pop((camion, pallet), (None, None))
+        if ubicacion is None:
+            return
+        remaining = [a for a in self.pallet_assignments.get(ubicacion, [])
+                     if not (str(a.get('camion', '')) == camion and str(a.get('pallet', '')) == pallet)]
+        if remaining:
+            self.pallet_assignments[ubicacion] = remaining
+        else:
+            self.pallet_assignments.pop(ubicacion, None)
+
+    def _release_truck(self, truck):
+        # Liberar asignaciones en memoria
+        for ubicacion in list(self.pallet_assignments):
+            remaining = [a for a in self.pallet_assignments[ubicacion] if str(a.get('camion', '')) != truck]
+            if remaining:
+                self.pallet_assignments[ubicacion] = remaining
+            else:
+                del self.pallet_assignments[ubicacion]
+        self._pallet_locations = {k: v for k, v in self._pallet_locations.items() if k[0] != truck}
+        self.scans_db = {scan for scan in self.scans_db if scan[0] != truck}
+
+    def relocate_pallet(self, truck, pallet, ubicacion, slot=None):
+        """Mueve un pallet escaneado a otra ubicación del layout. Regresa (ubicacion, slot) o (None, None) si no cabe."""
+        truck, pallet = str(truck), str(pallet)
+        with self._lock:
+            if not self.is_scanned(truck, pallet) or ubicacion not in self._location_set:
+                return None, None
+            current = [a for a in self.pallet_assignments.get(ubicacion, [])
+                       if not (str(a.get('camion', '')) == truck and str(a.get('pallet', '')) == pallet)]
+            used_slots = {a.get('slot', 1) for a in current}
+            if slot is None:
+                slot = 1 if 1 not in used_slots else 2
+            if len(current) >= SLOTS_PER_LOCATION or slot in used_slots:
+                return None, None
+            self._apply_event('relocated', truck, pallet, ubicacion, slot)
+            self._log_events([('relocated', truck, pallet, None, None, ubicacion, slot)])
+        return ubicacion, slot
+
+    @tracer.timed("sqlite.deliver_truck")
+    def deliver_truck(self, truck):
+        """Liberar todas las ubicaciones de un camión entregado"""
+        truck = str(truck)
+        with self._lock:
+            self._apply_event('delivered', truck, None)
+            saved = self._log_events([('delivered', truck, None, None, None, None, None)])
+        saved.result()
+
+        if self.status_updater:
+            self.status_updater(truck, "Entregado")
+        return True
+
+    def clear(self):
+        """Borra todos los escaneos (botón Limpiar DB). El log conserva la historia con un evento 'cleared'."""
+        with self._lock:
+            self._apply_event('cleared', None, None)
+            saved = self._log_events([('cleared', None, None, None, None, None, None)])
+        saved.result()
+
+
+def layout_bounds(shapes_data):
+    """(min_x, min_y, max_x, max_y) del layout; nunca menor que 0..1000."""
+    min_x, min_y, max_x, max_y = 0, 0, 1000, 1000
+
+    for shape in shapes_data:
+        if shape['type'] == 'rect':
+            min_x = min(min_x, shape['x'])
+            min_y = min(min_y, shape['y'])
+            max_x = max(max_x, shape['x'] + shape['width'])
+            max_y = max(max_y, shape['y'] + shape['height'])
+        elif shape['type'] == 'text':
+            min_x = min(min_x, shape['x'])
+            min_y = min(min_y, shape['y'])
+            max_x = max(max_x, shape['x'] + 50)
+            max_y = max(max_y, shape['y'] + 20)
+    return min_x, min_y, max_x, max_y
+
+
+@tracer.timed("map.statuses")
+def location_statuses(pallet_assignments, locations, selected_truck, truck_pallets):
+    """Estado de cada ubicación para el mapa interactivo, con los mismos colores que el SVG.
+
+    Regresa {ubicacion: {'state': ..., 'pallets': [...]}} con state en
+    occupied (camión seleccionado, con info del packing), assigned (sin info),
+    other (otro camión) o available (libre para el camión seleccionado). Las
+    ubicaciones libres de otros camiones se omiten: es el estado por defecto.
+    """
+    info_by_pallet = {}
+    if not truck_pallets.empty:
+        for pallet in truck_pallets.to_dict('records'):
+            info_by_pallet.setdefault(str(pallet['Pallet number']), pallet)
+
+    statuses = {}
+    for ubicacion in dict.fromkeys(locations):
+        assignments = pallet_assignments.get(ubicacion)
+        if assignments is not None and not isinstance(assignments, list):
+            assignments = [assignments]
+        if assignments:
+            pallets = []
+            for assignment in assignments:
+                entry = {'pallet': str(assignment.get('pallet', '')), 'camion': str(assignment.get('camion', ''))}
+                info = info_by_pallet.get(entry['pallet'])
+                if info is not None:
+                    entry.update(first_serial=str(info['first_serial']), last_serial=str(info['last_serial']),
+                                 box_count=str(info['box_count']))
+                pallets.append(entry)
+            if any(p['camion'] == str(selected_truck) for p in pallets):
+                state = 'occupied' if any('first_serial' in p for p in pallets) else 'assigned'
+            else:
+                state = 'other'
+            statuses[ubicacion] = {'state': state, 'pallets': pallets}
+        elif ubicacion.startswith(f'C{selected_truck}-'):
+            statuses[ubicacion] = {'state': 'available', 'pallets': []}
+    return statuses
+
+
+def status_changes(previous, current):
+    """Ubicaciones cuyo estado cambió; las que volvieron al estado por defecto van como None."""
+    changes = {loc: status for loc, status in current.items() if previous.get(loc) != status}
+    changes.update((loc, None) for loc in previous if loc not in current)
+    return changes
+
+
+@tracer.timed("svg.render")
+def generate_enhanced_svg_layout(shapes_data, pallet_assignments, selected_truck, truck_pallets, zoom_level=1.0, pan_x=0, pan_y=0):
+    """Genera SVG mejorado con dos pallets por ubicación y mejor visualización"""
+    # Calcular dimensiones del viewBox
+    min_x, min_y, max_x, max_y = layout_bounds(shapes_data)
+    
+    width = max_x - min_x + 100
+    height = max_y - min_y + 100
+    
+    # Aplicar zoom y pan al viewBox
+    zoom_factor = 1.0 / zoom_level
+    viewbox_width = width * zoom_factor
+    viewbox_height = height * zoom_factor
+    viewbox_x = min_x - 50 - (viewbox_width - width) / 2 + pan_x
+    viewbox_y = min_y - 50 - (viewbox_height - height) / 2 + pan_y
+    
+    svg_content = f'<svg width="100%" height="800" viewBox="{viewbox_x} {viewbox_y} {viewbox_width} {viewbox_height}" xmlns="http://www.w3.org/2000/svg" preserveAspectRatio="xMidYMid meet">\n'
+    
+    # Fondo con cuadrícula para mejor referencia
+    svg_content += f'<rect x="{min_x-50}" y="{min_y-50}" width="{width}" height="{height}" fill="#f0f8ff" stroke="#b0c4de" stroke-width="1"/>\n'
+    
+    # Dibujar cuadrícula de referencia
+    grid_spacing = 50
+    for x in range(int(min_x), int(max_x) + 100, grid_spacing):
+        svg_content += f'<line x1="{x}" y1="{min_y-50}" x2="{x}" y2="{max_y+50}" stroke="#d3d3d3" stroke-width="0.5" stroke-dasharray="2,2"/>\n'
+    for y in range(int(min_y), int(max_y) + 100, grid_spacing):
+        svg_content += f'<line x1="{min_x-50}" y1="{y}" x2="{max_x+50}" y2="{y}" stroke="#d3d3d3" stroke-width="0.5" stroke-dasharray="2,2"/>\n'
+    
+    # Dibujar formas principales
+    for shape in shapes_data:
+        ubicacion = shape['ubicacion']
+        
+        # Determinar color según estado
+        fill_color = "#e8e8e8"
+        stroke_color = "#a0a0a0"
+        stroke_width = "1.5"
+        opacity = "0.9"
+        
+        # Contar pallets en esta ubicación
+        pallets_in_location = []
+        if ubicacion in pallet_assignments:
+            assignment = pallet_assignments[ubicacion]
+            if isinstance(assignment, list):
+                # Múltiples pallets en esta ubicación
+                pallets_in_location = assignment
+            else:
+                # Un solo pallet (compatibilidad hacia atrás)
+                pallets_in_location = [assignment]
+        
+        # Buscar información de pallets para esta ubicación
+        pallets_info = []
+        for assignment in pallets_in_location:
+            pallet_info = None
+            if not truck_pallets.empty:
+                for _, pallet in truck_pallets.iterrows():
+                    if str(pallet['Pallet number']) == str(assignment.get('pallet', '')):
+                        pallet_info = pallet
+                        break
+            pallets_info.append({
+                'assignment': assignment,
+                'info': pallet_info
+            })
+        
+        # Determinar color basado en los pallets
+        if pallets_info:
+            # Verificar si alguno de los pallets pertenece al camión seleccionado
+            has_current_truck_pallet = any(
+                str(p['assignment'].get('camion', '')) == str(selected_truck) 
+                for p in pallets_info
+            )
+            
+            if has_current_truck_pallet:
+                # Verificar si tenemos información completa
+                has_complete_info = any(p['info'] is not None for p in pallets_info)
+                if has_complete_info:
+                    fill_color = "#dc3545"  # Rojo - Ocupado con info completa
+                    stroke_color = "#a71e2a"
+                else:
+                    fill_color = "#ffc107"  # Amarillo - Asignado pero info incompleta
+                    stroke_color = "#d39e00"
+            else:
+                fill_color = "#6c757d"  # Gris - Otro camión
+                stroke_color = "#495057"
+        elif ubicacion.startswith(f'C{selected_truck}-'):
+            fill_color = "#28a745"  # Verde - Disponible para este camión
+            stroke_color = "#1e7e34"
+        else:
+            fill_color = "#f8f9fa"  # Gris muy claro - No disponible
+            stroke_color = "#dee2e6"
+            opacity = "0.7"
+        
+        if shape['type'] == 'rect':
+            # CREAR GRUPO CON TOOLTIP PARA EL RECTÁNGULO
+            svg_content += f'<g>\n'
+            
+            # Tooltip con información completa
+            tooltip_text = f"📍 Ubicación: {ubicacion}\n"
+            tooltip_text += f"📦 Capacidad: 2 pallets (estiba)\n"
+            
+            if pallets_info:
+                tooltip_text += f"🚛 Pallets asignados: {len(pallets_info)}/2\n"
+                for i, pallet_data in enumerate(pallets_info):
+                    assignment = pallet_data['assignment']
+                    info = pallet_data['info']
+                    tooltip_text += f"\n--- Pallet {i+1} ---\n"
+                    tooltip_text += f"📦 Pallet: {assignment.get('pallet', 'N/A')}\n"
+                    tooltip_text += f"🚛 Camión: {assignment.get('camion', 'N/A')}\n"
+                    if info is not None:
+                        tooltip_text += f"🔢 Serial Inicial: {info['first_serial']}\n"
+                        tooltip_text += f"🔢 Serial Final: {info['last_serial']}\n"
+                        tooltip_text += f"📦 Cajas: {info['box_count']}\n"
+            else:
+                tooltip_text += f"✅ Disponible para camión {selected_truck}"
+            
+            svg_content += f'<title>{tooltip_text}</title>\n'
+            
+            # Dibujar rectángulo principal
+            svg_content += f'<rect x="{shape["x"]}" y="{shape["y"]}" width="{shape["width"]}" height="{shape["height"]}" fill="{fill_color}" stroke="{stroke_color}" stroke-width="{stroke_width}" opacity="{opacity}" rx="3" ry="3"/>\n'
+            
+            # Dibujar división para dos pallets (línea horizontal en el medio)
+            mid_y = shape["y"] + shape["height"] / 2
+            svg_content += f'<line x1="{shape["x"]}" y1="{mid_y}" x2="{shape["x"] + shape["width"]}" y2="{mid_y}" stroke="{stroke_color}" stroke-width="1" opacity="0.7"/>\n'
+            
+            # Indicador de cantidad de pallets (círculos pequeños)
+            if pallets_info:
+                occupied_count = len(pallets_info)
+                for i in range(2):
+                    circle_x = shape["x"] + 10 + (i * 15)
+                    circle_y = shape["y"] + shape["height"] - 10
+                    circle_fill = "#dc3545" if i < occupied_count else "#28a745"
+                    svg_content += f'<circle cx="{circle_x}" cy="{circle_y}" r="4" fill="{circle_fill}" stroke="#ffffff" stroke-width="1"/>\n'
+            
+            svg_content += '</g>\n'
+            
+        elif shape['type'] == 'polygon':
+            # CREAR GRUPO CON TOOLTIP PARA EL POLÍGONO
+            svg_content += f'<g>\n'
+            
+            # Tooltip con información completa
+            tooltip_text = f"📍 Ubicación: {ubicacion}\n"
+            tooltip_text += f"📦 Capacidad: 2 pallets (estiba)\n"
+            
+            if pallets_info:
+                tooltip_text += f"🚛 Pallets asignados: {len(pallets_info)}/2\n"
+                for i, pallet_data in enumerate(pallets_info):
+                    assignment = pallet_data['assignment']
+                    info = pallet_data['info']
+                    tooltip_text += f"\n--- Pallet {i+1} ---\n"
+                    tooltip_text += f"📦 Pallet: {assignment.get('pallet', 'N/A')}\n"
+                    tooltip_text += f"🚛 Camión: {assignment.get('camion', 'N/A')}\n"
+                    if info is not None:
+                        tooltip_text += f"🔢 Serial Inicial: {info['first_serial']}\n"
+                        tooltip_text += f"🔢 Serial Final: {info['last_serial']}\n"
+                        tooltip_text += f"📦 Cajas: {info['box_count']}\n"
+            else:
+                tooltip_text += f"✅ Disponible para camión {selected_truck}"
+            
+            svg_content += f'<title>{tooltip_text}</title>\n'
+            points_str = " ".join(shape['points'])
+            svg_content += f'<polygon points="{points_str}" fill="{fill_color}" stroke="{stroke_color}" stroke-width="{stroke_width}" opacity="{opacity}"/>\n'
+            svg_content += '</g>\n'
+    
+    # Dibujar textos/etiquetas con mejor contraste
+    for shape in shapes_data:
+        if shape['type'] == 'text':
+            ubicacion = shape['ubicacion']
+            
+            # Determinar color de fondo para contraste
+            bg_color = "#e8e8e8"
+            pallets_in_location = []
+            if ubicacion in pallet_assignments:
+                assignment = pallet_assignments[ubicacion]
+                if isinstance(assignment, list):
+                    pallets_in_location = assignment
+                else:
+                    pallets_in_location = [assignment]
+            
+            if pallets_in_location:
+                has_current_truck = any(str(p.get('camion', '')) == str(selected_truck) for p in pallets_in_location)
+                if has_current_truck:
+                    bg_color = "#dc3545"
+                else:
+                    bg_color = "#6c757d"
+            elif ubicacion.startswith(f'C{selected_truck}-'):
+                bg_color = "#28a745"
+            
+            # Fondo para el texto
+            text_bg_x = shape["x"] - 20
+            text_bg_y = shape["y"] - 12
+            text_bg_width = 40
+            text_bg_height = 20
+            svg_content += f'<rect x="{text_bg_x}" y="{text_bg_y}" width="{text_bg_width}" height="{text_bg_height}" fill="{bg_color}" opacity="0.9" rx="2" ry="2"/>\n'
+            
+            # Texto
+            text_color = "#ffffff" if bg_color in ["#dc3545", "#6c757d", "#28a745"] else "#000000"
+            svg_content += f'<text x="{shape["x"]}" y="{shape["y"]}" fill="{text_color}" font-size="{10/zoom_level}" font-weight="bold" text-anchor="middle" dominant-baseline="middle">{shape["content"] or ubicacion}</text>\n'
+    
+    # Leyenda mejorada
+    legend_x = min_x - 30
+    legend_y = max_y + 40
+    
+    svg_content += f'''
+    <g transform="translate({legend_x}, {legend_y})">
+        <rect x="0" y="0" width="120" height="80" fill="#ffffff" stroke="#dee2e6" stroke-width="1" opacity="0.9" rx="5" ry="5"/>
+        
+        <rect x="10" y="10" width="15" height="15" fill="#28a745" stroke="#1e7e34" stroke-width="1"/>
+        <text x="30" y="20" font-size="10" fill="#000000">Disponible</text>
+        
+        <rect x="10" y="30" width="15" height="15" fill="#dc3545" stroke="#a71e2a" stroke-width="1"/>
+        <text x="30" y="40" font-size="10" fill="#000000">Ocupado</text>
+        
+        <rect x="10" y="50" width="15" height="15" fill="#ffc107" stroke="#d39e00" stroke-width="1"/>
+        <text x="30" y="60" font-size="10" fill="#000000">Asignado</text>
+        
+        <circle cx="75" cy="15" r="4" fill="#dc3545" stroke="#ffffff" stroke-width="1"/>
+        <text x="85" y="17" font-size="8" fill="#000000">Pallocupado</text>
+        
+        <circle cx="75" cy="30" r="4" fill="#28a745" stroke="#ffffff" stroke-width="1"/>
+        <text x="85" y="32" font-size="8" fill="#000000">Pallibre</text>
+    </g>
+    '''
+    
+    svg_content += '</svg>'
+    return svg_content
@@ -0,0 +1,87 @@
+"""Mapa interactivo del almacén (componente de Streamlit).
+
+El navegador recibe la geometría del layout una sola vez y hace el zoom, el
+pan y los tooltips por su cuenta; en cada rerun el servidor solo manda las
+ubicaciones cuyo estado cambió desde el último envío.
+
+Protocolo con el navegador (warehouse_map_frontend/index.html):
+- args: version del layout, layout (solo cuando hace falta), seq, base y
+  changes. `base` es el seq sobre el que aplican los cambios; base=0 significa
+  estado completo (reemplaza todo).
+- Si el navegador no tiene el layout de esa versión o se saltó un seq, regresa
+  {'need': 'layout' | 'full', 'at': marca} y el siguiente rerun reenvía.
+"""
+import os
+
+import streamlit as st
+import streamlit.components.v1 as components
+
+from warehouse_engine import layout_bounds, status_changes
+
+FRONTEND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "warehouse_map_frontend")
+
+_component = components.declare_component("warehouse_map", path=FRONTEND_DIR)
+
+
+class MapSync:
+    """Lo que ya tiene el navegador: versión del layout y últimos estados enviados (vive en session_state)."""
+
+    def __init__(self):
+        self.version = None
+        self.sent = {}
+        self.seq = 0
+        self.message = None      # (base, changes) del último seq, se repite hasta que haya otro
+        self._handled = None
+
+    def update(self, version, statuses, request=None):
+        """Regresa (send_layout, base, changes) para este rerun."""
+        send_layout = False
+        full = False
+        if request and request.get('at') != self._handled:
+            self._handled = request.get('at')
+            send_layout = request.get('need') == 'layout'
+            full = True
+        if version != self.version:
+            self.version = version
+            send_layout = full = True
+
+        if full:
+            self.seq += 1
+            self.message = (0, statuses)
+        else:
+            changes = status_changes(self.sent, statuses)
+            if changes:
+                self.seq += 1
+                self.message = (self.seq - 1, changes)
+        self.sent = statuses
+        base, changes = self.message
+        return send_layout, base, changes
+
+
+def layout_payload(shapes_data):
+    """Geometría que el navegador dibuja una vez."""
+    min_x, min_y, max_x, max_y = layout_bounds(shapes_data)
+    shapes = [
+        {key: value for key, value in shape.items() if key not in ('fill', 'stroke')}
+        for shape in shapes_data
+    ]
+    return {'bounds': [min_x, min_y, max_x, max_y], 'shapes': shapes}
+
+
+def warehouse_map(sync, version, shapes_data, statuses, selected_truck, height=800, key="warehouse_map"):
+    """Dibuja el mapa; `sync` es el MapSync de la sesión."""
+    # Lo que regresó el navegador la última vez (Streamlit lo guarda bajo la key)
+    request = st.session_state.get(key)
+    send_layout, base, changes = sync.update(version, statuses, request)
+    return _component(
+        version=version,
+        layout=layout_payload(shapes_data) if send_layout else None,
+        seq=sync.seq,
+        base=base,
+        changes=changes,
+        truck=str(selected_truck),
+        height=height,
+        key=key,
+        default=None,
+    )
+